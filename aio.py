@@ -0,0 +1,155 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+import time
+
+import telegram
+
+from delivery import CLOSE_TIMEOUT, DeliveryQueue
+import homework
+import metrics
+from ratelimit import RateLimiter
+import render_pool
+from scheduler import Scheduler
+import sharding
+from storage import open_store
+from transport import make_session
+import webhook
+
+MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', 100))
+
+_executor = None
+
+
+def get_executor():
+    """Возвращает общий пул потоков для блокирующих HTTP-вызовов."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_IN_FLIGHT,
+            thread_name_prefix='homework-io'
+        )
+    return _executor
+
+
+async def run_blocking(func, *args):
+    """Выполняет блокирующий вызов в пуле, не останавливая цикл событий."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(),
+        functools.partial(func, *args)
+    )
+
+
+async def async_get_api_answer(current_timestamp):
+    """Асинхронно запрашивает API сервиса Практикум.Домашка."""
+    return await run_blocking(homework.get_api_answer, current_timestamp)
+
+
+async def async_fetch_homeworks(headers, current_timestamp, session):
+    """Асинхронно запрашивает статусы домашек конкретного аккаунта."""
+    return await run_blocking(
+        homework.fetch_homeworks, headers, current_timestamp, session
+    )
+
+
+async def async_send_message(bot, message):
+    """Асинхронно направляет сообщение в чат телеграмм."""
+    return await run_blocking(homework.send_message, bot, message)
+
+
+async def async_send_to_chat(bot, chat_id, message):
+    """Асинхронно направляет сообщение в указанный чат телеграмм."""
+    return await run_blocking(homework.send_to_chat, bot, chat_id, message)
+
+
+async def poll_forever(bot, tenants, store=None, limit=MAX_IN_FLIGHT,
+                       shard=None, session=None, limiter=None):
+    """Опрашивает аккаунты, держа в работе не больше limit запросов.
+
+    Сессию и ограничитель частоты можно передать, чтобы разделить их
+    с догоняющим опросом.
+    """
+    session = session or make_session(pool_size=limit)
+    limiter = limiter or RateLimiter()
+    backoff = homework.make_backoff()
+    scheduler = Scheduler(homework.RETRY_TIME, on_lag=metrics.POLL_LAG.observe)
+    semaphore = asyncio.Semaphore(limit)
+    wakeup = asyncio.Event()
+    tasks = set()
+    homework.plan_tenants(
+        scheduler, tenants, shard,
+        functools.partial(
+            asyncio.get_running_loop().call_soon_threadsafe, wakeup.set
+        )
+    )
+
+    async def poll(tenant):
+        delay = None
+        try:
+            delay = await run_blocking(
+                homework.poll_planned,
+                bot, tenant, session, store, limiter, backoff, shard
+            )
+        finally:
+            semaphore.release()
+            if delay is None:
+                delay = homework.plan_tenant(backoff, tenant, False)
+            scheduler.reschedule(tenant, delay)
+            wakeup.set()
+
+    while scheduler or tasks or shard is not None:
+        delay = scheduler.next_delay() if scheduler else None
+        if delay is None or delay > 0:
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await semaphore.acquire()
+        tenant = scheduler.pop()
+        if tenant is None:
+            semaphore.release()
+            continue
+        task = asyncio.create_task(poll(tenant))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+async def async_main():
+    """Основная логика работы бота в асинхронном режиме."""
+    if not homework.check_tokens():
+        raise ValueError(homework.CHECK_TOKENS)
+    bot = DeliveryQueue(telegram.Bot(token=homework.TELEGRAM_TOKEN)).start()
+    metrics.BACKLOG.set_function(bot.backlog)
+    metrics.serve()
+    store = open_store()
+    tenants = homework.load_tenants(int(time.time()), store)
+    shard = sharding.open_shard(tenants, store)
+    session = make_session(pool_size=MAX_IN_FLIGHT)
+    limiter = RateLimiter()
+    webhook.serve(functools.partial(
+        homework.receive_event, bot, tenants, store, shard=shard
+    ))
+    try:
+        await run_blocking(
+            homework.catch_up,
+            bot, tenants, session, store, limiter, shard
+        )
+        await poll_forever(
+            bot, tenants, store,
+            shard=shard,
+            session=session,
+            limiter=limiter
+        )
+    finally:
+        render_pool.shutdown()
+        try:
+            bot.close(CLOSE_TIMEOUT)
+            if shard is not None:
+                shard.close()
+        finally:
+            if store is not None:
+                store.close()
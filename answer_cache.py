@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import hashlib
+import os
+import re
+import threading
+
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', 100000))
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(\d+)')
+
+
+def body_digest(body):
+    """Возвращает хеш тела ответа без поля current_date и само поле.
+
+    Сервер кладет в current_date время ответа, поэтому без него хеш
+    совпадает у ответов с теми же домашками.
+    """
+    match = CURRENT_DATE.search(body)
+    if match is None:
+        return hashlib.sha256(body).digest(), None
+    return (
+        hashlib.sha256(body[:match.start()] + body[match.end():]).digest(),
+        int(match.group(1))
+    )
+
+
+class CachedAnswer:
+    """Последний ответ API аккаунту: валидаторы, хеш и неотправленное."""
+
+    __slots__ = ('etag', 'modified', 'digest', 'homeworks', 'fields')
+
+    def __init__(self, etag, modified, digest, homeworks, fields):
+        self.etag = etag
+        self.modified = modified
+        self.digest = digest
+        self.homeworks = homeworks
+        self.fields = fields
+
+    def validators(self):
+        """Возвращает заголовки условного запроса."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.modified:
+            headers['If-Modified-Since'] = self.modified
+        return headers
+
+
+class AnswerCache:
+    """LRU-кеш последних ответов API по ключу аккаунта.
+
+    Пока уведомления по ответу не отправлены, запись хранит его домашки,
+    чтобы повторить их при 304 или том же теле; после commit домашки
+    отбрасываются и совпавший ответ не требует никакой работы.
+    """
+
+    def __init__(self, size=ANSWER_CACHE_SIZE):
+        self.size = size
+        self._answers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._answers)
+
+    def get(self, key):
+        """Возвращает запись аккаунта или None."""
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is not None:
+                self._answers.move_to_end(key)
+            return answer
+
+    def put(self, key, answer):
+        """Запоминает ответ, вытесняя самый старый при переполнении."""
+        with self._lock:
+            self._answers[key] = answer
+            self._answers.move_to_end(key)
+            if len(self._answers) > self.size:
+                self._answers.popitem(last=False)
+
+    def discard(self, key):
+        """Забывает ответ аккаунта."""
+        with self._lock:
+            self._answers.pop(key, None)
+
+    def commit(self, key):
+        """Отмечает, что уведомления по последнему ответу отправлены."""
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is not None:
+                answer.homeworks = ()
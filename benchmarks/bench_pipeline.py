@@ -0,0 +1,220 @@
+"""Нагрузочный прогон цепочки опрос -> разбор -> уведомление.
+
+Поднимает локальные заглушки API Практикума и Bot API телеграм, опрашивает
+заданное число аккаунтов через poll_tenant и печатает пропускную
+способность, задержку уведомлений и расход памяти на аккаунт.
+
+    python benchmarks/bench_pipeline.py --tenants 1000 --homeworks 20
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telegram  # noqa: E402
+from telegram.utils.request import Request  # noqa: E402
+
+from delivery import DeliveryQueue  # noqa: E402
+import homework  # noqa: E402
+from ratelimit import RateLimiter  # noqa: E402
+from tenants import Tenant  # noqa: E402
+from transport import make_session  # noqa: E402
+
+STATUSES = ('reviewing', 'approved')
+REPORT = (
+    'tenants={tenants} homeworks={homeworks} rounds={rounds}\n'
+    'polls/sec: {polls_per_sec:.1f}\n'
+    'notify latency p50: {p50_ms:.1f} ms, p99: {p99_ms:.1f} ms\n'
+    'rss per tenant: {rss_per_tenant_kb:.2f} KiB'
+)
+
+
+def rss_kb():
+    """Возвращает текущий RSS процесса в КиБ."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+class Quiet(BaseHTTPRequestHandler):
+    """Обработчик без записи каждого запроса в stderr."""
+
+    def log_message(self, *args):
+        """Не пишет каждый запрос в stderr."""
+        pass
+
+    def reply(self, payload):
+        """Отвечает JSON-документом."""
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def practicum_handler(homeworks):
+    """Заглушка API: каждый опрос меняет статус первой домашки."""
+    polls = {}
+    lock = threading.Lock()
+
+    class Handler(Quiet):
+        def do_GET(self):
+            """Отдает список домашек аккаунта."""
+            token = self.headers['Authorization']
+            with lock:
+                polls[token] = polls.get(token, -1) + 1
+                status = STATUSES[polls[token] % 2]
+            self.reply({
+                'homeworks': [
+                    {
+                        'id': index,
+                        'homework_name': f'hw{index}',
+                        'status': status if index == 0 else 'approved',
+                        'reviewer_comment': 'x' * 64,
+                        'lesson_name': 'lesson',
+                    }
+                    for index in range(homeworks)
+                ],
+                'current_date': int(time.time()),
+            })
+
+    return Handler
+
+
+def telegram_handler(arrivals):
+    """Заглушка Bot API: запоминает время прихода сообщения в чат."""
+
+    class Handler(Quiet):
+        def do_POST(self):
+            """Принимает sendMessage."""
+            length = int(self.headers['Content-Length'])
+            data = json.loads(self.rfile.read(length))
+            arrivals.append((int(data['chat_id']), time.monotonic()))
+            self.reply({'ok': True, 'result': {
+                'message_id': 1,
+                'date': int(time.time()),
+                'chat': {'id': int(data['chat_id']), 'type': 'private'},
+                'text': data['text'],
+            }})
+
+    return Handler
+
+
+def serve(handler):
+    """Запускает заглушку в фоновом потоке и возвращает ее адрес."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def percentile(values, share):
+    """Возвращает перцентиль share из списка значений."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def run(tenants=100, homeworks=10, rounds=3, concurrency=16,
+        workers=4, limits=False):
+    """Прогоняет rounds опросов каждого аккаунта и возвращает метрики."""
+    arrivals = []
+    practicum, practicum_url = serve(practicum_handler(homeworks))
+    bot_api, bot_api_url = serve(telegram_handler(arrivals))
+    endpoint = homework.ENDPOINT
+    homework.ENDPOINT = practicum_url + '/api/user_api/homework_statuses/'
+    bot = telegram.Bot(
+        token='123456:bench',
+        base_url=bot_api_url + '/bot',
+        request=Request(con_pool_size=workers + 1)
+    )
+    unlimited = None if limits else RateLimiter(
+        rate=1e9, burst=1e9, key_rate=1e9, key_burst=1e9
+    )
+    queue = DeliveryQueue(bot, workers=workers, limiter=unlimited).start()
+    session = make_session(pool_size=concurrency)
+    limiter = RateLimiter() if limits else None
+
+    rss_before = rss_kb()
+    accounts = [Tenant(f'token{index}', index) for index in range(tenants)]
+    started = {}
+
+    def poll(tenant):
+        started[tenant.chat_id] = time.monotonic()
+        homework.poll_tenant(queue, tenant, session, None, limiter)
+
+    began = time.monotonic()
+    latencies = []
+    try:
+        with ThreadPoolExecutor(concurrency) as pool:
+            for _ in range(rounds):
+                del arrivals[:]
+                list(pool.map(poll, accounts))
+                deadline = time.monotonic() + 30
+                while (
+                    len(arrivals) < tenants
+                    and time.monotonic() < deadline
+                ):
+                    time.sleep(0.01)
+                latencies.extend(
+                    arrived - started[chat_id]
+                    for chat_id, arrived in arrivals
+                )
+        elapsed = time.monotonic() - began
+        rss_after = rss_kb()
+    finally:
+        homework.ENDPOINT = endpoint
+        queue.close(5)
+        practicum.shutdown()
+        bot_api.shutdown()
+    return {
+        'tenants': tenants,
+        'homeworks': homeworks,
+        'rounds': rounds,
+        'polls_per_sec': tenants * rounds / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'rss_per_tenant_kb': max(rss_after - rss_before, 0) / tenants,
+    }
+
+
+def main():
+    """Разбирает аргументы командной строки и печатает отчет."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--homeworks', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument(
+        '--limits', action='store_true',
+        help='использовать боевые лимиты запросов к API и телеграм'
+    )
+    parser.add_argument(
+        '--log', action='store_true',
+        help='не отключать журнал бота во время прогона'
+    )
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    if not args.log:
+        logging.disable(logging.WARNING)
+    report = run(
+        args.tenants, args.homeworks, args.rounds,
+        args.concurrency, args.workers, args.limits
+    )
+    print(json.dumps(report) if args.json else REPORT.format(**report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+
+from exceptions import CircuitOpen
+from logs import lazy
+import metrics
+
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', 60))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+BREAKER_OPENED = (
+    'Сервис {name} недоступен после {failures} ошибок подряд, '
+    'вызовы приостановлены на {cooldown} с'
+)
+BREAKER_CLOSED = 'Сервис {name} снова доступен'
+BREAKER_REJECTED = 'Вызов {name} отклонен: сервис недоступен'
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Предохранитель вокруг внешнего сервиса.
+
+    После threshold ошибок подряд размыкается на cooldown секунд и
+    отклоняет вызовы без обращения к сервису. Затем пропускает один
+    пробный вызов: успех замыкает цепь, ошибка снова размыкает ее.
+    """
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD,
+                 cooldown=BREAKER_COOLDOWN, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Возвращает, сколько секунд цепь еще будет разомкнута."""
+        if self.state != OPEN:
+            return 0
+        return max(self.opened_at + self.cooldown - self.clock(), 0)
+
+    def is_open(self):
+        """Проверяет без изменения состояния, что вызовы отклоняются."""
+        return self.remaining() > 0 or (
+            self.state == HALF_OPEN and self._probing
+        )
+
+    def allow(self):
+        """Разрешает вызов или отклоняет его, пока сервис недоступен."""
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if self.state == OPEN and self.remaining() == 0:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return self.state == CLOSED
+
+    def check(self):
+        """Бросает CircuitOpen, если вызов не разрешен."""
+        if not self.allow():
+            raise CircuitOpen(BREAKER_REJECTED.format(name=self.name))
+
+    def success(self):
+        """Отмечает успешный вызов."""
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                logger.warning(lazy(BREAKER_CLOSED, name=self.name))
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        """Отмечает ошибку сервиса."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state != OPEN:
+                    metrics.BREAKER_OPENED.inc(self.name)
+                    logger.warning(lazy(
+                        BREAKER_OPENED,
+                        name=self.name,
+                        failures=self.failures,
+                        cooldown=self.cooldown
+                    ))
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self._probing = False
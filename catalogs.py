@@ -0,0 +1,77 @@
+import json
+import os
+from string import Formatter
+
+from render import Renderer
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'locales')
+LANGUAGE = os.getenv('LANGUAGE', 'ru')
+FIELDS = {
+    'status_changed': {'name', 'verdict'},
+    'unknown_status': {'status'},
+    'error': {'error'},
+    'digest': {'count'},
+}
+
+UNKNOWN_FIELD = 'В шаблоне {key} каталога {language} лишнее поле {field}'
+UNKNOWN_LANGUAGE = 'Каталог сообщений для языка {language} не найден'
+
+
+def check_template(language, key, template):
+    """Разбирает шаблон при загрузке и проверяет его поля."""
+    for _, field, _, _ in Formatter().parse(template):
+        if field is not None and field not in FIELDS[key]:
+            raise ValueError(UNKNOWN_FIELD.format(
+                key=key, language=language, field=field
+            ))
+    return template
+
+
+class Catalog:
+    """Тексты уведомлений на одном языке."""
+
+    __slots__ = (
+        'language', 'render', 'status_changed', 'verdicts', 'error', 'digest'
+    )
+
+    def __init__(self, language, data):
+        self.language = language
+        templates = {
+            key: check_template(language, key, data[key]) for key in FIELDS
+        }
+        self.status_changed = templates['status_changed']
+        self.verdicts = dict(data['verdicts'])
+        self.render = Renderer(
+            self.status_changed,
+            self.verdicts,
+            unknown=templates['unknown_status']
+        ).render
+        self.error = templates['error']
+        self.digest = templates['digest']
+
+    def __repr__(self):
+        return f'Catalog({self.language!r})'
+
+
+def load_catalogs(directory=LOCALES_DIR):
+    """Загружает все каталоги *.json из directory."""
+    catalogs = {}
+    for filename in sorted(os.listdir(directory)):
+        language, extension = os.path.splitext(filename)
+        if extension != '.json':
+            continue
+        with open(os.path.join(directory, filename), encoding='utf-8') as file:
+            catalogs[language] = Catalog(language, json.load(file))
+    return catalogs
+
+
+def get_catalog(language=None):
+    """Возвращает каталог языка language или языка по умолчанию."""
+    catalog = CATALOGS.get(language or LANGUAGE)
+    if catalog is None:
+        raise KeyError(UNKNOWN_LANGUAGE.format(language=language))
+    return catalog
+
+
+CATALOGS = load_catalogs()
@@ -0,0 +1,302 @@
+from collections import deque
+import heapq
+import logging
+import os
+import threading
+import time
+
+from breaker import CircuitBreaker
+from logs import lazy
+import metrics
+from ratelimit import RateLimiter
+
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', 4))
+TELEGRAM_RATE = float(os.getenv('TELEGRAM_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+DIGEST_WINDOW = float(os.getenv('DIGEST_WINDOW', 0))
+CLOSE_TIMEOUT = float(os.getenv('DELIVERY_CLOSE_TIMEOUT', 10))
+BREAKER_PAUSE = 0.1
+MESSAGE_LIMIT = 4096
+SEPARATOR = '\n\n'
+ELLIPSIS = '…'
+
+DELIVERED = 'Сообщение доставлено в чат {chat_id}'
+NOT_DELIVERED = 'Сообщение в чат {chat_id} не доставлено: {error}'
+CALLBACK_FAILED = 'Ошибка в обработчике доставки сообщения в чат {chat_id}'
+FLOOD_CONTROL = 'Телеграм просит подождать {delay} с перед отправкой'
+CLOSE_TIMED_OUT = 'Очередь сообщений не доставлена за {timeout} с: {backlog}'
+
+logger = logging.getLogger(__name__)
+
+
+def truncate(text, limit=MESSAGE_LIMIT):
+    """Обрезает текст до limit символов, отмечая обрезку многоточием."""
+    if len(text) <= limit:
+        return text
+    return text[:limit - len(ELLIPSIS)] + ELLIPSIS
+
+
+def coalesce(messages, limit=MESSAGE_LIMIT):
+    """Склеивает подряд идущие сообщения очереди в одно не длиннее limit.
+
+    Очередь состоит из пар (текст, обработчики доставки); возвращается
+    такая же пара для склеенного сообщения. Одно сообщение длиннее limit
+    обрезается: телеграм отклонил бы его целиком, и следующий опрос
+    отправлял бы его снова.
+    """
+    text, callbacks = messages.popleft()
+    text = truncate(text, limit)
+    parts = [text]
+    callbacks = list(callbacks)
+    size = len(text)
+    while messages and size + len(SEPARATOR) + len(messages[0][0]) <= limit:
+        text, more = messages.popleft()
+        size += len(SEPARATOR) + len(text)
+        parts.append(text)
+        callbacks.extend(more)
+    return SEPARATOR.join(parts), tuple(callbacks)
+
+
+def split_messages(messages, limit=MESSAGE_LIMIT):
+    """Склеивает сообщения в как можно меньше сообщений не длиннее limit."""
+    queue = deque((message, ()) for message in messages)
+    while queue:
+        yield coalesce(queue, limit)[0]
+
+
+class Countdown:
+    """Собирает итоги доставки нескольких сообщений.
+
+    Когда отчитались все count сообщений, вызывает on_done(delivered),
+    где delivered — доставлены ли все.
+    """
+
+    def __init__(self, count, on_done):
+        self.count = count
+        self.delivered = True
+        self.on_done = on_done
+        self._lock = threading.Lock()
+
+    def callback(self, after=None):
+        """Возвращает обработчик доставки одного сообщения.
+
+        after вызывается, только если сообщение доставлено.
+        """
+        def done(delivered):
+            if delivered and after is not None:
+                after()
+            with self._lock:
+                self.delivered = self.delivered and delivered
+                self.count -= 1
+                finished = not self.count
+            if finished:
+                self.on_done(self.delivered)
+        return done
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений телеграм с пулом отправителей.
+
+    Повторяет интерфейс send_message бота, но только ставит сообщение
+    в очередь. Доставку подтверждает callback(delivered), вызванный после
+    ответа телеграма: True — сообщение принято, False — отброшено
+    (например, бот заблокирован в чате). Сетевые и неизвестные ошибки
+    не отбрасывают сообщение, а возвращают его в очередь; после close
+    сообщение не повторяется, а подтверждается с delivered=False, чтобы
+    его отправил следующий опрос. Сообщения
+    одного чата отправляются по порядку одним отправителем, накопившиеся
+    склеиваются в одно. С окном window первое
+    сообщение чата ждет window секунд, чтобы собрать сводку из всех
+    сообщений, пришедших за это время.
+    """
+
+    def __init__(self, bot, workers=DELIVERY_WORKERS, limiter=None,
+                 breaker=None, window=DIGEST_WINDOW, clock=time.monotonic):
+        self.bot = bot
+        self.workers = workers
+        self.window = window
+        self.clock = clock
+        self.breaker = breaker or CircuitBreaker('telegram')
+        self.limiter = limiter or RateLimiter(
+            rate=TELEGRAM_RATE,
+            burst=TELEGRAM_RATE,
+            key_rate=TELEGRAM_CHAT_RATE,
+            key_burst=1
+        )
+        self._pending = {}
+        self._ready = deque()
+        self._delayed = []
+        self._busy = set()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def send_message(self, chat_id, text, callback=None):
+        """Ставит сообщение в очередь чата."""
+        with self._condition:
+            messages = self._pending.get(chat_id)
+            if messages is None:
+                messages = self._pending[chat_id] = deque()
+                if chat_id not in self._busy:
+                    self._schedule(chat_id)
+            messages.append((text, (callback,) if callback else ()))
+            self._condition.notify()
+        return True
+
+    def backlog(self):
+        """Возвращает число сообщений, ожидающих отправки."""
+        with self._condition:
+            return sum(len(messages) for messages in self._pending.values())
+
+    def start(self):
+        """Запускает отправителей."""
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work,
+                name=f'delivery-{index}',
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def close(self, timeout=None):
+        """Дожидается отправки очереди и останавливает отправителей.
+
+        Возвращает False, если отправители не закончили за timeout секунд.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(
+                None if deadline is None
+                else max(deadline - time.monotonic(), 0)
+            )
+        alive = [thread for thread in self._threads if thread.is_alive()]
+        self._threads = alive
+        if alive:
+            logger.warning(lazy(
+                CLOSE_TIMED_OUT, timeout=timeout, backlog=self.backlog()
+            ))
+        return not alive
+
+    def _schedule(self, chat_id):
+        if self.window > 0:
+            heapq.heappush(
+                self._delayed, (self.clock() + self.window, chat_id)
+            )
+        else:
+            self._ready.append(chat_id)
+
+    def _promote(self):
+        """Переводит чаты с истекшим окном в готовые; возвращает ожидание."""
+        now = self.clock()
+        while self._delayed and (
+            self._closed or self._delayed[0][0] <= now
+        ):
+            self._ready.append(heapq.heappop(self._delayed)[1])
+        if self._delayed:
+            return self._delayed[0][0] - now
+        return None
+
+    def _take(self):
+        with self._condition:
+            while True:
+                timeout = self._promote()
+                if self._ready:
+                    break
+                if self._closed and not self._busy:
+                    self._condition.notify_all()
+                    return None, None
+                self._condition.wait(timeout)
+            chat_id = self._ready.popleft()
+            self._busy.add(chat_id)
+            messages = self._pending.pop(chat_id)
+            message = coalesce(messages)
+            if messages:
+                self._pending[chat_id] = messages
+            return chat_id, message
+
+    def _release(self, chat_id, retry=None):
+        with self._condition:
+            self._busy.discard(chat_id)
+            if retry is not None:
+                self._pending.setdefault(chat_id, deque()).appendleft(retry)
+                self._ready.append(chat_id)
+            elif chat_id in self._pending:
+                self._schedule(chat_id)
+            self._condition.notify_all()
+
+    def _deliver(self, chat_id, text):
+        """Отправляет сообщение.
+
+        Возвращает True, если телеграм его принял, False, если оно
+        отброшено, и None, если его нужно вернуть в очередь.
+        """
+        from telegram.error import (
+            BadRequest, NetworkError, RetryAfter, TelegramError
+        )
+        if not self.breaker.allow():
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed,
+                    max(self.breaker.remaining(), BREAKER_PAUSE)
+                )
+            return None
+        try:
+            self.limiter.acquire(chat_id)
+            with metrics.SEND_LATENCY.time():
+                self.bot.send_message(chat_id, text)
+        except RetryAfter as error:
+            self.breaker.success()
+            metrics.ERRORS.inc(type(error).__name__)
+            logger.warning(lazy(FLOOD_CONTROL, delay=error.retry_after))
+            self.limiter.retry_after(error.retry_after)
+            return None
+        except BadRequest as error:
+            self.breaker.success()
+            metrics.ERRORS.inc(type(error).__name__)
+            logger.warning(lazy(NOT_DELIVERED, chat_id=chat_id, error=error))
+            return False
+        except NetworkError as error:
+            self.breaker.failure()
+            metrics.ERRORS.inc(type(error).__name__)
+            logger.warning(lazy(NOT_DELIVERED, chat_id=chat_id, error=error))
+            return None
+        except TelegramError as error:
+            self.breaker.success()
+            metrics.ERRORS.inc(type(error).__name__)
+            logger.warning(lazy(NOT_DELIVERED, chat_id=chat_id, error=error))
+            return False
+        except Exception as error:
+            self.breaker.failure()
+            metrics.ERRORS.inc(type(error).__name__)
+            logger.exception(
+                lazy(NOT_DELIVERED, chat_id=chat_id, error=error)
+            )
+            return None
+        self.breaker.success()
+        logger.info(lazy(DELIVERED, chat_id=chat_id))
+        return True
+
+    def _confirm(self, chat_id, callbacks, delivered):
+        for callback in callbacks:
+            try:
+                callback(delivered)
+            except Exception:
+                logger.exception(lazy(CALLBACK_FAILED, chat_id=chat_id))
+
+    def _work(self):
+        while True:
+            chat_id, message = self._take()
+            if chat_id is None:
+                return
+            text, callbacks = message
+            delivered = self._deliver(chat_id, text)
+            if delivered is None and not self._closed:
+                self._release(chat_id, message)
+                continue
+            self._confirm(chat_id, callbacks, bool(delivered))
+            self._release(chat_id)
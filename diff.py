@@ -0,0 +1,11 @@
+def transitions(known, homeworks):
+    """Возвращает домашки с изменившимся статусом и их прежний статус."""
+    for homework in homeworks:
+        previous = known.get(homework.name)
+        if previous != homework.status:
+            yield homework, previous
+
+
+def commit(known, homework):
+    """Запоминает статус домашки после успешного уведомления."""
+    known[homework.name] = homework.status
@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# Модули читают настройки из окружения при импорте, поэтому точка входа
+# импортирует этот модуль раньше остальных модулей проекта.
+load_dotenv()
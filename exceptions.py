@@ -1,5 +1,26 @@
-class ServerDenied(Exception):
-    pass
-
-class ResponseStatusError(Exception):
-    pass
+class ServerDenied(Exception):
+    """API Практикума вернул ответ с кодом ошибки."""
+
+    pass
+
+
+class ResponseStatusError(Exception):
+    """API Практикума вернул статус, отличный от 200."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimited(ResponseStatusError):
+    """API Практикума ограничил частоту запросов (статус 429)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message, 429)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(Exception):
+    """Вызов отклонен: внешний сервис признан недоступным."""
+
+    pass
@@ -1,47 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
 from http import HTTPStatus
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import threading
 import time
 
-from dotenv import load_dotenv
-import requests
-import telegram
-
+import environment  # noqa: F401
+from delivery import (
+    CLOSE_TIMEOUT, Countdown, DeliveryQueue, split_messages
+)
+import diff
+from answer_cache import AnswerCache, CachedAnswer, body_digest
+from breaker import CircuitBreaker
+from catalogs import get_catalog
 from exceptions import (
+    CircuitOpen,
+    RateLimited,
     ServerDenied,
     ResponseStatusError
 )
-
-load_dotenv()
+from logs import lazy
+import logs
+import metrics
+from ratelimit import RateLimiter, parse_retry_after
+from scheduler import Backoff, Scheduler
+from records import Homework
+import render_pool
+from storage import open_store
+from singleflight import SingleFlight
+from streaming import ObjectStream
+from tenants import Tenant, TenantRegistry, tenant_key
+from transport import make_session
+import webhook
+from webhook import NotOwner, UnknownTenant
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(
-    __file__ + '.log',
-    maxBytes=50000000,
-    backupCount=5
-)
-logger.addHandler(handler)
 
 PRACTICUM_TOKEN = os.getenv('PR_TOKEN')
 TELEGRAM_TOKEN = os.getenv('BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('CHAT_ID')
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+ASYNC_POLLING = os.getenv('ASYNC_POLLING')
 
 TOKENS = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
 ERROR_CODES = ['code', 'error']
 
 RETRY_TIME = 600
+RECONCILE_TIME = float(os.getenv('WEBHOOK_RECONCILE_TIME', 3600))
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', 10))
+CATCHUP_AFTER = float(os.getenv('CATCHUP_AFTER', 3600))
+CATCHUP_CONCURRENCY = int(os.getenv('CATCHUP_CONCURRENCY', 8))
+STREAM_THRESHOLD = int(os.getenv('STREAM_THRESHOLD', 262144))
+CHUNK_SIZE = 65536
+REVIEWING = 'reviewing'
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+API_BREAKER = CircuitBreaker('practicum')
+ANSWERS = AnswerCache()
+IN_FLIGHT = SingleFlight()
+TENANT_LOCKS = tuple(threading.Lock() for _ in range(64))
 
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
-
-PARSE_STATUS = 'Изменился статус проверки работы "{name}". {verdict}'
+CATALOG = get_catalog('ru')
+HOMEWORK_VERDICTS = CATALOG.verdicts
+PARSE_STATUS = CATALOG.status_changed
 REQUEST_ERROR = (
     'Запрос {url} с заголовками {headers} и'
     'параметрами {params}: '
@@ -64,57 +87,204 @@ NOT_LIST = (
 )
 HOMEWORK_STATUS = 'Неожиданный статус {status}'
 CHECK_TOKENS = 'Один или несколько токенов отсутствуют'
-CHECK_STATUS = 'Статус проверки не изменился'
-MESSAGE_ERROR = 'Сбой в работе программы: {error}'
+TRANSITION = 'Статус работы "{name}" изменился: {previous} -> {status}'
+MESSAGE_ERROR = CATALOG.error
+CATCHING_UP = 'Курсор отстал у аккаунтов: {count}, догоняем сводками'
+CATCH_UP_FAILED = 'Не удалось догнать аккаунт чата {chat_id}'
+API_ANSWER = 'API Практикума ответил со статусом {status}'
 MESSAGE_SENT = 'Сообщение {message} направлено в чат'
 MESSAGE_NOT_SENT = 'Сообщение {message} не удалось направить в чат; {error}'
 
 
 def send_message(bot, message):
     """Направляет сообщение в чат телеграмм."""
+    return send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_to_chat(bot, chat_id, message):
+    """Направляет сообщение в указанный чат телеграмм."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logger.info(
-            MESSAGE_SENT.format(message=message)
-        )
+        bot.send_message(chat_id, message)
+        logger.info(lazy(MESSAGE_SENT, message=message))
         return True
     except Exception as error:
-        logger.exception(
-            MESSAGE_NOT_SENT.format(message=message, error=error)
-        )
+        logger.exception(lazy(MESSAGE_NOT_SENT, message=message, error=error))
         return False
 
 
 def get_api_answer(current_timestamp):
     """Направляет запрос в API сервиса Практикум.Домашка."""
+    return fetch_homeworks(HEADERS, current_timestamp)
+
+
+def request_homeworks(headers, current_timestamp, session=None,
+                      stream=False, validators=None):
+    """Выполняет запрос к API и проверяет статус ответа.
+
+    С заголовками условного запроса validators ответ 304 тоже считается
+    успешным.
+    """
     request_data = dict(
         url=ENDPOINT,
-        headers=HEADERS,
+        headers={**headers, **validators} if validators else headers,
         params={'from_date': current_timestamp}
     )
+    import requests
+    if session is None:
+        session = requests
+    API_BREAKER.check()
     try:
-        response = requests.get(**request_data)
+        with metrics.API_LATENCY.time() as timer:
+            response = session.get(
+                **request_data,
+                timeout=REQUEST_TIMEOUT,
+                stream=stream
+            )
     except requests.exceptions.RequestException as error:
+        API_BREAKER.failure()
         raise ConnectionError(
             REQUEST_ERROR.format(text=error, **request_data)
         )
+    except BaseException:
+        API_BREAKER.failure()
+        raise
+    if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        API_BREAKER.failure()
+    else:
+        API_BREAKER.success()
+    log_answer(response, timer)
+    if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+        raise RateLimited(
+            STATUS_ERROR.format(status=response.status_code, **request_data),
+            parse_retry_after(response.headers.get('Retry-After'))
+        )
+    if response.status_code == HTTPStatus.NOT_MODIFIED and validators:
+        return response, request_data
     if response.status_code != HTTPStatus.OK:
         raise ResponseStatusError(
-            STATUS_ERROR.format(status=response.status_code, **request_data)
+            STATUS_ERROR.format(status=response.status_code, **request_data),
+            response.status_code
         )
-    result = response.json()
+    return response, request_data
+
+
+def log_answer(response, timer):
+    """Пишет в журнал статус и время ответа API.
+
+    Частые ответы прореживаются выборкой LOG_SAMPLE_RATE.
+    """
+    logger.info(
+        lazy(API_ANSWER, status=response.status_code),
+        extra=dict(
+            endpoint=ENDPOINT,
+            status_code=response.status_code,
+            latency=round(timer.elapsed, 4)
+        )
+    )
+
+
+def check_error_code(key, value, request_data):
+    """Проверяет, что поле ответа не является кодом ошибки API."""
+    if key in ERROR_CODES:
+        raise ServerDenied(
+            RESPONSE_ERROR.format(code=key, text=value, **request_data)
+        )
+
+
+def check_error_codes(result, request_data):
+    """Проверяет, что ответ API не содержит кодов ошибки."""
     for key in ERROR_CODES:
         if key in result:
-            raise ServerDenied(
-                RESPONSE_ERROR.format(
-                    code=key,
-                    text=result[key],
-                    **request_data
-                )
-            )
+            check_error_code(key, result[key], request_data)
+
+
+def fetch_homeworks(headers, current_timestamp, session=None):
+    """Запрашивает статусы домашек с заголовками конкретного аккаунта.
+
+    Одновременные запросы с тем же токеном и from_date выполняются одним
+    запросом к API, его ответ или ошибку получают все.
+    """
+    return IN_FLIGHT.do(
+        ('fetch', tenant_key(headers.get('Authorization')), current_timestamp),
+        download_homeworks,
+        headers,
+        current_timestamp,
+        session
+    )
+
+
+def download_homeworks(headers, current_timestamp, session=None):
+    """Скачивает и разбирает ответ API без объединения запросов."""
+    response, request_data = request_homeworks(
+        headers,
+        current_timestamp,
+        session
+    )
+    result = response.json()
+    check_error_codes(result, request_data)
     return result
 
 
+def stream_homeworks(headers, current_timestamp, session=None,
+                     cache=None, key=None):
+    """Запрашивает статусы домашек, разбирая большой ответ потоково.
+
+    Возвращает итерируемые домашки и словарь остальных полей ответа;
+    при потоковом разборе словарь заполняется по мере чтения. С кешем
+    ответов cache запрос условный, а 304 и тот же ответ не разбираются.
+    """
+    cached = cache.get(key) if cache is not None else None
+    response, request_data = request_homeworks(
+        headers,
+        current_timestamp,
+        session,
+        stream=True,
+        validators=cached.validators() if cached is not None else None
+    )
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        response.close()
+        metrics.CACHED_ANSWERS.inc('not_modified')
+        return cached.homeworks, dict(cached.fields)
+    length = response.headers.get('Content-Length')
+    if length is not None and int(length) <= STREAM_THRESHOLD:
+        return read_answer(response, request_data, cache, key, cached)
+    if cache is not None:
+        cache.discard(key)
+    answer = ObjectStream(
+        response.iter_content(CHUNK_SIZE),
+        'homeworks',
+        on_field=lambda name, value: check_error_code(
+            name, value, request_data
+        ),
+        close=response.close
+    )
+    return answer, answer.fields
+
+
+def read_answer(response, request_data, cache=None, key=None, cached=None):
+    """Читает небольшой ответ целиком; тот же ответ повторно не разбирается."""
+    digest, current_date = body_digest(response.content)
+    if cached is not None and cached.digest == digest:
+        metrics.CACHED_ANSWERS.inc('same_body')
+        fields = dict(cached.fields)
+        if current_date is not None:
+            fields['current_date'] = current_date
+        return cached.homeworks, fields
+    result = response.json()
+    check_error_codes(result, request_data)
+    homeworks = check_response(result)
+    if cache is not None:
+        cache.put(key, CachedAnswer(
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            digest,
+            homeworks,
+            {name: value for name, value in result.items()
+             if name != 'homeworks'}
+        ))
+    return homeworks, result
+
+
 def check_response(response):
     """Проверяет, что полученные данные в нужном формате."""
     if not isinstance(response, dict):
@@ -130,58 +300,498 @@ def check_response(response):
 
 def parse_status(homework):
     """Проверяет данные полученной домашки и возвращает текущий статус."""
-    name = homework['homework_name']
-    status = homework['status']
+    homework = Homework.from_api(homework)
+    name = homework.name
+    status = homework.status
     if status not in HOMEWORK_VERDICTS:
         raise ValueError(HOMEWORK_STATUS.format(status=status))
-    return PARSE_STATUS.format(
-        name=name,
-        verdict=HOMEWORK_VERDICTS[status]
-    )
+    return CATALOG.render(name, status)
 
 
 def check_tokens():
     """Проверяет наличие и валидность необходимых переменных окружения."""
-    tokens_failed = [name for name in TOKENS if not globals()[name]]
+    names = ('TELEGRAM_TOKEN',) if TENANTS_FILE else TOKENS
+    tokens_failed = [name for name in names if not globals()[name]]
     if tokens_failed:
         logging.error(f'Токен(ы) {tokens_failed} отсутствует')
     return not tokens_failed
 
 
+def tenant_lock(tenant):
+    """Возвращает блокировку, под которой меняются статусы аккаунта."""
+    return TENANT_LOCKS[hash(tenant.key) % len(TENANT_LOCKS)]
+
+
+def latest_homeworks(homeworks):
+    """Оставляет по одной записи на домашку — последнюю в ответе."""
+    latest = {}
+    for item in homeworks:
+        name = Homework.from_api(item).name
+        latest.pop(name, None)
+        latest[name] = item
+    return list(latest.values())
+
+
+def prepare_transitions(tenant, homeworks):
+    """Проверяет домашки и готовит уведомления, при RENDER_POOL — в пуле.
+
+    Если домашка встречается в ответе несколько раз, берется ее последняя
+    запись, а не первая отличающаяся от известного статуса.
+    """
+    homeworks = latest_homeworks(homeworks)
+    pool = render_pool.get_pool()
+    with metrics.PARSE_TIME.time():
+        if pool is None:
+            return render_pool.prepare(
+                tenant.homeworks, homeworks, tenant.catalog.language
+            )
+        return pool.prepare(
+            tenant.homeworks, homeworks, tenant.catalog.language
+        )
+
+
+def known_status(tenant, name):
+    """Возвращает статус домашки с учетом уведомлений, ждущих доставки."""
+    return tenant.queued.get(name, tenant.homeworks.get(name))
+
+
+def settle_queued(tenant, statuses, on_done, delivered):
+    """Снимает отметки об уведомлениях в очереди после ответа телеграма.
+
+    Недоставленные статусы снова отправит следующий опрос или событие.
+    """
+    with tenant_lock(tenant):
+        for name, status in statuses.items():
+            if tenant.queued.get(name) == status:
+                del tenant.queued[name]
+    if on_done is not None:
+        on_done(delivered)
+
+
+def commit_status(tenant, name, status):
+    """Запоминает статус домашки после доставки уведомления о нем."""
+    with tenant_lock(tenant):
+        diff.commit(tenant.homeworks, Homework(name, status))
+
+
+def send_batch(bot, tenant, messages, on_done=None):
+    """Отправляет в чат аккаунта пары (текст, действие после доставки).
+
+    on_done(delivered) вызывается, когда доставлены все сообщения или
+    одно из них не удалось отправить. Через DeliveryQueue это происходит
+    после ответа телеграма, а не при постановке в очередь, поэтому
+    состояние аккаунта не сохраняется раньше доставки.
+    """
+    on_done = on_done or (lambda delivered: None)
+    if not messages:
+        return on_done(True)
+    if not isinstance(bot, DeliveryQueue):
+        for text, after in messages:
+            if not send_to_chat(bot, tenant.chat_id, text):
+                return on_done(False)
+            if after is not None:
+                after()
+        return on_done(True)
+
+    def finish(delivered):
+        try:
+            on_done(delivered)
+        finally:
+            with tenant_lock(tenant):
+                tenant.pending -= 1
+
+    with tenant_lock(tenant):
+        tenant.pending += 1
+    countdown = Countdown(len(messages), finish)
+    for text, after in messages:
+        bot.send_message(
+            tenant.chat_id, text, callback=countdown.callback(after)
+        )
+
+
+def notify_transitions(bot, tenant, homeworks, on_done=None):
+    """Уведомляет о смене статусов домашек.
+
+    Статус домашки запоминается после доставки уведомления о нем, а
+    on_done(delivered) вызывается после доставки всех. Пока уведомление
+    в очереди, тот же статус из другого опроса или события не отправляется
+    повторно. Возвращает, были ли изменения.
+    """
+    transitions = prepare_transitions(tenant, homeworks)
+    messages = []
+    queued = {}
+    with tenant_lock(tenant):
+        for name, status, previous, message in transitions:
+            if known_status(tenant, name) == status:
+                continue
+            tenant.queued[name] = queued[name] = status
+            logging.debug(lazy(
+                TRANSITION,
+                name=name,
+                previous=previous,
+                status=status
+            ))
+            messages.append((
+                message,
+                functools.partial(commit_status, tenant, name, status)
+            ))
+    send_batch(bot, tenant, messages, functools.partial(
+        settle_queued, tenant, queued, on_done
+    ))
+    return bool(transitions)
+
+
+def notify_digest(bot, tenant, homeworks, on_done=None):
+    """Сообщает обо всех сменах статусов одной сводкой.
+
+    Для каждой домашки берется последний статус; сводка длиннее лимита
+    телеграма делится на несколько сообщений. Статусы запоминаются после
+    доставки всей сводки. Возвращает, были ли изменения.
+    """
+    transitions = prepare_transitions(tenant, homeworks)
+    with tenant_lock(tenant):
+        pending = [
+            (name, status, message)
+            for name, status, _, message in transitions
+            if known_status(tenant, name) != status
+        ]
+        queued = {name: status for name, status, _ in pending}
+        tenant.queued.update(queued)
+    if not pending:
+        send_batch(bot, tenant, [], on_done)
+        return bool(transitions)
+
+    def commit(delivered):
+        if delivered:
+            for name, status, _ in pending:
+                commit_status(tenant, name, status)
+        settle_queued(tenant, queued, on_done, delivered)
+
+    header = tenant.catalog.digest.format(count=len(pending))
+    texts = split_messages([header] + [message for _, _, message in pending])
+    send_batch(bot, tenant, [(text, None) for text in texts], commit)
+    return True
+
+
+def poll_tenant(bot, tenant, session=None, store=None, limiter=None,
+                digest=False, shard=None):
+    """Опрашивает API для одного аккаунта и отправляет новые статусы.
+
+    Возвращает True, если у аккаунта появились изменения. Опрос, запущенный
+    для того же аккаунта и курсора, пока идет такой же, ждет его итога.
+    С digest все изменения отправляются одной сводкой.
+    """
+    return IN_FLIGHT.do(
+        ('poll', tenant.key, tenant.current_date),
+        refresh_tenant,
+        bot, tenant, session, store, limiter, digest, shard
+    )
+
+
+def refresh_tenant(bot, tenant, session=None, store=None, limiter=None,
+                   digest=False, shard=None):
+    """Выполняет один опрос аккаунта без объединения.
+
+    Пока уведомления прошлого опроса в очереди, аккаунт не опрашивается.
+    """
+    if tenant.pending:
+        return False
+    changed = False
+    metrics.POLLS.inc()
+    try:
+        if API_BREAKER.is_open():
+            raise CircuitOpen(API_BREAKER.name)
+        if limiter is not None:
+            limiter.acquire(tenant.key, tenant_priority(tenant))
+        homeworks, fields = stream_homeworks(
+            tenant.headers,
+            tenant.current_date,
+            session,
+            ANSWERS,
+            tenant.key
+        )
+        notify = notify_digest if digest else notify_transitions
+        changed = notify(
+            bot,
+            tenant,
+            homeworks,
+            functools.partial(advance_cursor, tenant, fields, store, shard)
+        )
+    except CircuitOpen as error:
+        metrics.ERRORS.inc(type(error).__name__)
+    except RateLimited as error:
+        metrics.ERRORS.inc(type(error).__name__)
+        logging.warning(error, extra=log_fields(tenant, error))
+        if limiter is not None:
+            limiter.retry_after(error.retry_after or RETRY_TIME)
+    except Exception as error:
+        report_error(bot, tenant, error)
+    return changed
+
+
+def advance_cursor(tenant, fields, store, shard, delivered):
+    """Сдвигает курсор и сохраняет аккаунт, если все уведомления доставлены."""
+    if not delivered:
+        return
+    ANSWERS.commit(tenant.key)
+    tenant.current_date = fields.get('current_date', tenant.current_date)
+    save_tenant(tenant, store, shard)
+
+
+def report_error(bot, tenant, error):
+    """Пишет сбой опроса в журнал и один раз сообщает о нем в чат."""
+    metrics.ERRORS.inc(type(error).__name__)
+    message = tenant.catalog.error.format(error=error)
+    logging.error(
+        lazy(MESSAGE_ERROR, error=error),
+        extra=log_fields(tenant, error)
+    )
+    if (
+        message != tenant.error_message
+        and send_to_chat(bot, tenant.chat_id, message)
+    ):
+        tenant.error_message = message
+
+
+def receive_event(bot, tenants, store, token, answer, shard=None):
+    """Обрабатывает присланный ретранслятором ответ API для аккаунта.
+
+    Курсор current_date не сдвигается: его ведет сверочный опрос. При
+    шардировании событие для чужого аккаунта отклоняется.
+    """
+    tenant = tenants.get(token)
+    if tenant is None:
+        raise UnknownTenant(token)
+    if shard is None:
+        return notify_event(bot, tenant, store, answer)
+    with shard.lease(tenant) as owned:
+        if not owned:
+            raise NotOwner(tenant.key)
+        notify_event(bot, tenant, store, answer, shard)
+
+
+def notify_event(bot, tenant, store, answer, shard=None):
+    """Уведомляет о статусах из события и сохраняет их после доставки."""
+    metrics.EVENTS.inc()
+    notify_transitions(
+        bot,
+        tenant,
+        check_response(answer),
+        functools.partial(save_delivered, tenant, store, shard)
+    )
+
+
+def save_delivered(tenant, store, shard, delivered):
+    """Сохраняет статусы аккаунта после доставки уведомлений."""
+    if delivered:
+        save_tenant(tenant, store, shard)
+
+
+def save_tenant(tenant, store, shard=None):
+    """Сохраняет аккаунт, если его аренда еще у этого воркера.
+
+    Иначе поздняя доставка перезаписала бы курсор нового владельца.
+    """
+    if store is not None and (shard is None or shard.holds(tenant)):
+        store.save(tenant)
+
+
+def log_fields(tenant, error):
+    """Возвращает поля структурированного журнала для ошибки опроса."""
+    return dict(
+        tenant=tenant.key,
+        endpoint=ENDPOINT,
+        status_code=getattr(error, 'status_code', None),
+        exception=type(error).__name__
+    )
+
+
+def tenant_priority(tenant):
+    """Возвращает приоритет опроса: работы на проверке идут первыми."""
+    return 0 if REVIEWING in tenant.homeworks.values() else 1
+
+
+def plan_tenant(backoff, tenant, changed):
+    """Вычисляет задержку до следующего опроса аккаунта."""
+    tenant.interval = backoff.next(
+        tenant.interval,
+        changed,
+        tenant_priority(tenant) == 0
+    )
+    return backoff.spread(tenant.interval)
+
+
+def poll_planned(bot, tenant, session, store, limiter, backoff, shard=None):
+    """Опрашивает аккаунт и возвращает задержку до следующего опроса.
+
+    При шардировании аккаунт с истекшей арендой не опрашивается
+    и проверяется снова через интервал продления аренды.
+    """
+    if shard is None:
+        return plan_tenant(
+            backoff,
+            tenant,
+            poll_tenant(bot, tenant, session, store, limiter)
+        )
+    with shard.lease(tenant) as owned:
+        if not owned:
+            return shard.interval
+        return plan_tenant(
+            backoff,
+            tenant,
+            poll_tenant(bot, tenant, session, store, limiter, shard=shard)
+        )
+
+
+def plan_tenants(scheduler, tenants, shard=None, wake=None):
+    """Ставит в расписание аккаунты этого воркера.
+
+    При шардировании расписание следует за долей воркера: отданные
+    аккаунты убираются из него, полученные добавляются, после чего
+    вызывается wake.
+    """
+    if shard is None:
+        scheduler.spread(tenants)
+        return
+    shard.subscribe(functools.partial(follow_shard, scheduler, wake))
+
+
+def follow_shard(scheduler, wake, gained, dropped):
+    """Переносит смену доли аккаунтов воркера в расписание."""
+    scheduler.remove(dropped)
+    scheduler.add(gained)
+    if wake is not None:
+        wake()
+
+
+def make_backoff():
+    """Создает политику интервалов; при приеме событий опрос — сверочный."""
+    if webhook.WEBHOOK_PORT:
+        return Backoff(RECONCILE_TIME, fast=RECONCILE_TIME)
+    return Backoff(RETRY_TIME)
+
+
+def catch_up_tenant(bot, tenant, session, store, limiter, shard=None):
+    """Догоняет один аккаунт сводкой, если он принадлежит этому воркеру."""
+    if shard is None:
+        return poll_tenant(bot, tenant, session, store, limiter, True)
+    with shard.lease(tenant) as owned:
+        return owned and poll_tenant(
+            bot, tenant, session, store, limiter, True, shard
+        )
+
+
+def catch_up(bot, tenants, session=None, store=None, limiter=None,
+             shard=None, now=None):
+    """Догоняет аккаунты, курсор которых отстал больше чем на CATCHUP_AFTER.
+
+    Отставшие аккаунты опрашиваются сразу, не дожидаясь расписания, не
+    больше CATCHUP_CONCURRENCY одновременно, и каждый чат получает одну
+    сводку. Возвращает число догнанных аккаунтов.
+    """
+    now = time.time() if now is None else now
+    behind = [
+        tenant for tenant in tenants
+        if now - tenant.current_date > CATCHUP_AFTER
+    ]
+    if not behind:
+        return 0
+    logger.info(lazy(CATCHING_UP, count=len(behind)))
+    with ThreadPoolExecutor(
+        max_workers=CATCHUP_CONCURRENCY,
+        thread_name_prefix='homework-catchup'
+    ) as executor:
+        futures = {
+            executor.submit(
+                catch_up_tenant, bot, tenant, session, store, limiter, shard
+            ): tenant
+            for tenant in behind
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                logger.error(
+                    lazy(CATCH_UP_FAILED, chat_id=futures[future].chat_id),
+                    exc_info=error
+                )
+    return len(behind)
+
+
+def load_tenants(current_timestamp, store=None):
+    """Собирает реестр аккаунтов и восстанавливает их курсоры."""
+    if TENANTS_FILE:
+        tenants = TenantRegistry.load(TENANTS_FILE, current_timestamp)
+    else:
+        tenants = TenantRegistry(
+            [Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, current_timestamp)]
+        )
+    if store is not None:
+        store.restore(tenants)
+    return tenants
+
+
 def main():
     """Основная логика работы бота."""
     if not check_tokens():
         raise ValueError(CHECK_TOKENS)
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    status = ''
-    error_message = ''
-    while True:
+    if ASYNC_POLLING:
+        import asyncio
+        from aio import async_main
+        return asyncio.run(async_main())
+    import telegram
+    import sharding
+    bot = DeliveryQueue(telegram.Bot(token=TELEGRAM_TOKEN)).start()
+    metrics.BACKLOG.set_function(bot.backlog)
+    metrics.serve()
+    session = make_session()
+    store = open_store()
+    limiter = RateLimiter()
+    backoff = make_backoff()
+    tenants = load_tenants(int(time.time()), store)
+    shard = sharding.open_shard(tenants, store)
+    webhook.serve(functools.partial(
+        receive_event, bot, tenants, store, shard=shard
+    ))
+    catch_up(bot, tenants, session, store, limiter, shard)
+    scheduler = Scheduler(RETRY_TIME, on_lag=metrics.POLL_LAG.observe)
+    plan_tenants(scheduler, tenants, shard)
+    try:
+        scheduler.run(functools.partial(
+            poll_planned, bot,
+            session=session,
+            store=store,
+            limiter=limiter,
+            backoff=backoff,
+            shard=shard
+        ))
+    finally:
+        render_pool.shutdown()
         try:
-            response = get_api_answer(current_timestamp)
-            message = parse_status(check_response(response))
-            if status == message:
-                logging.debug(CHECK_STATUS)
-                continue
-            if send_message(bot, message):
-                status = message
-                current_timestamp = response.get(
-                    'current_date',
-                    current_timestamp
-                )
-        except Exception as error:
-            message = MESSAGE_ERROR.format(error=error)
-            logging.error(message)
-            if message != error_message and send_message(bot, message):
-                error_message = message
+            bot.close(CLOSE_TIMEOUT)
+            if shard is not None:
+                shard.close()
         finally:
-            time.sleep(RETRY_TIME)
+            if store is not None:
+                store.close()
 
 
-if __name__ == '__main__':
+def run():
+    """Настраивает журнал и запускает бота."""
     logging.basicConfig(
         level=logging.DEBUG,
         format='%(asctime)s %(levelname)s %(message)s',
         filemode='w'
     )
+    logger.addHandler(logs.file_handler(__file__ + '.log'))
+    logs.structure(logger, logging.getLogger())
+    if logs.LOG_QUEUE:
+        logs.enqueue_handlers(logger, logging.getLogger())
     main()
+
+
+if __name__ == '__main__':
+    # Запуск через модуль homework: aio импортирует его по имени, и без
+    # этого в процессе были бы две копии модуля с разными логгерами
+    # и глобальными объектами.
+    import homework
+    homework.run()
@@ -0,0 +1,237 @@
+import atexit
+import json
+import logging
+from logging.handlers import QueueHandler, RotatingFileHandler
+import os
+from queue import Empty, SimpleQueue
+import random
+import re
+import threading
+import time
+
+LOG_QUEUE = os.getenv('LOG_QUEUE')
+LOG_BATCH = int(os.getenv('LOG_BATCH', 256))
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1))
+LOG_DEDUP_WINDOW = float(os.getenv('LOG_DEDUP_WINDOW', 60))
+LOG_MAX_BYTES = 50000000
+LOG_BACKUP_COUNT = 5
+
+FIELDS = ('tenant', 'endpoint', 'status_code', 'latency', 'exception')
+SECRETS = (
+    (re.compile(r'(OAuth\s+)[^\s\'",}]+'), r'\1***'),
+    (re.compile(r'\b\d{5,}:[\w-]{20,}\b'), '***'),
+)
+
+
+class LazyMessage:
+    """Шаблон сообщения, который форматируется только при записи."""
+
+    __slots__ = ('template', 'kwargs')
+
+    def __init__(self, template, kwargs):
+        self.template = template
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return self.template.format(**self.kwargs)
+
+
+def lazy(template, **kwargs):
+    """Откладывает template.format(**kwargs) до записи в журнал."""
+    return LazyMessage(template, kwargs)
+
+
+class LazyQueueHandler(QueueHandler):
+    """Кладет запись в очередь, не форматируя ее в вызывающем потоке."""
+
+    def prepare(self, record):
+        """Возвращает запись без изменений."""
+        return record
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler, который сбрасывает буфер раз в пачку записей."""
+
+    def flush(self):
+        """Не сбрасывает буфер после каждой записи."""
+        pass
+
+    def commit(self):
+        """Сбрасывает накопленные записи на диск."""
+        super().flush()
+
+
+def redact(text):
+    """Заменяет токены в тексте на ***."""
+    for pattern, replacement in SECRETS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def message_key(record):
+    """Возвращает ключ записи без подставленных значений."""
+    if isinstance(record.msg, LazyMessage):
+        return record.msg.template
+    if isinstance(record.msg, str):
+        return record.msg
+    return type(record.msg).__name__
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в компактную JSON-строку без секретов."""
+
+    def format(self, record):
+        """Возвращает JSON с текстом записи и ее типизированными полями."""
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': redact(record.getMessage()),
+        }
+        for field in FIELDS + ('repeated',):
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data.setdefault('exception', record.exc_info[0].__name__)
+            data['traceback'] = redact(self.formatException(record.exc_info))
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class Deduplicate(logging.Filter):
+    """Отбрасывает повторы одной ошибки и прореживает частые записи.
+
+    Предупреждение или ошибка с тем же шаблоном и классом исключения
+    пропускается не чаще раза в window секунд; следующая пропущенная
+    запись получает поле repeated с числом отброшенных. Записи ниже
+    WARNING не схлопываются, а сохраняются с вероятностью sample_rate.
+    """
+
+    def __init__(self, window=LOG_DEDUP_WINDOW, sample_rate=LOG_SAMPLE_RATE,
+                 clock=time.monotonic, rand=random.random):
+        super().__init__()
+        self.window = window
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.rand = rand
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """Решает, записывать ли запись."""
+        if record.levelno < logging.WARNING:
+            return self.rand() < self.sample_rate
+        if not self.window:
+            return True
+        key = (
+            record.levelno,
+            message_key(record),
+            getattr(record, 'exception', None)
+        )
+        now = self.clock()
+        with self._lock:
+            last, dropped = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.window:
+                self._seen[key] = (last, dropped + 1)
+                return False
+            self._seen[key] = (now, 0)
+        if dropped:
+            record.repeated = dropped
+        return True
+
+
+def structure(*loggers):
+    """Включает JSON-формат и отсев повторов, если LOG_FORMAT=json."""
+    if LOG_FORMAT != 'json':
+        return
+    formatter = JsonFormatter()
+    for logger in loggers:
+        for handler in logger.handlers:
+            handler.setFormatter(formatter)
+            handler.addFilter(Deduplicate())
+
+
+def file_handler(path):
+    """Создает обработчик файла журнала с ротацией по 50 МБ."""
+    handler_class = (
+        BatchRotatingFileHandler if LOG_QUEUE else RotatingFileHandler
+    )
+    return handler_class(
+        path,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT
+    )
+
+
+class BatchWriter:
+    """Фоновый поток, который пишет записи из очереди пачками."""
+
+    _stop = object()
+
+    def __init__(self, queue, handlers, batch=LOG_BATCH):
+        self.queue = queue
+        self.handlers = handlers
+        self.batch = batch
+        self._thread = None
+
+    def start(self):
+        """Запускает поток записи."""
+        self._thread = threading.Thread(
+            target=self._run,
+            name='log-writer',
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Дописывает очередь и останавливает поток."""
+        if self._thread is not None:
+            self.queue.put(self._stop)
+            self._thread.join()
+            self._thread = None
+
+    def _drain(self):
+        records = [self.queue.get()]
+        while len(records) < self.batch:
+            try:
+                records.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return records
+
+    def _write(self, records):
+        for record in records:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        for handler in self.handlers:
+            getattr(handler, 'commit', handler.flush)()
+
+    def _run(self):
+        while True:
+            records = self._drain()
+            stop = self._stop in records
+            self._write(
+                [record for record in records if record is not self._stop]
+            )
+            if stop:
+                return
+
+
+def enqueue_handlers(*loggers):
+    """Переносит запись журналов loggers в фоновый поток."""
+    writers = []
+    for logger in loggers:
+        handlers = list(logger.handlers)
+        if not handlers:
+            continue
+        queue = SimpleQueue()
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(LazyQueueHandler(queue))
+        writer = BatchWriter(queue, handlers).start()
+        atexit.register(writer.stop)
+        writers.append(writer)
+    return writers
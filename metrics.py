@@ -0,0 +1,244 @@
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+LAG_BUCKETS = (0.1, 1, 5, 15, 30, 60, 120, 300, 600, 1800)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(names, values):
+    """Возвращает метки в формате {name="value",...}."""
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{value}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Монотонно растущий счетчик с необязательными метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        """Увеличивает счетчик для набора меток."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        """Возвращает значение счетчика для набора меток."""
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        """Возвращает строки метрики в текстовом формате Prometheus."""
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f'{self.name}{format_labels(self.labels, labels)} {value}'
+            for labels, value in values
+        ]
+
+
+class Gauge:
+    """Текущее значение, которое вычисляется при каждом чтении."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._function = None
+
+    def set_function(self, function):
+        """Задает функцию, которая возвращает текущее значение."""
+        self._function = function
+
+    def samples(self):
+        """Возвращает строки метрики в текстовом формате Prometheus."""
+        if self._function is None:
+            return []
+        return [f'{self.name} {self._function()}']
+
+
+class Histogram:
+    """Гистограмма значений с фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Добавляет наблюдение."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self):
+        """Возвращает контекстный менеджер, замеряющий время блока."""
+        return Timer(self)
+
+    def count(self):
+        """Возвращает число наблюдений."""
+        return sum(self._counts)
+
+    def samples(self):
+        """Возвращает строки метрики в текстовом формате Prometheus."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total}')
+        lines.append(f'{self.name}_count {cumulative}')
+        return lines
+
+
+class Timer:
+    """Замеряет время выполнения блока with в гистограмму."""
+
+    __slots__ = ('histogram', 'started', 'elapsed')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started
+        self.histogram.observe(self.elapsed)
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """Добавляет метрику в набор и возвращает ее."""
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+API_LATENCY = REGISTRY.register(Histogram(
+    'homework_api_request_seconds',
+    'Время запроса к API Практикума'
+))
+PARSE_TIME = REGISTRY.register(Histogram(
+    'homework_parse_seconds',
+    'Время разбора ответа и поиска изменений'
+))
+SEND_LATENCY = REGISTRY.register(Histogram(
+    'homework_send_seconds',
+    'Время отправки сообщения в телеграм'
+))
+POLL_LAG = REGISTRY.register(Histogram(
+    'homework_poll_lag_seconds',
+    'Опоздание опроса относительно расписания',
+    LAG_BUCKETS
+))
+POLLS = REGISTRY.register(Counter(
+    'homework_polls_total',
+    'Число опросов API Практикума'
+))
+EVENTS = REGISTRY.register(Counter(
+    'homework_events_total',
+    'Число событий, принятых от ретранслятора'
+))
+ERRORS = REGISTRY.register(Counter(
+    'homework_errors_total',
+    'Число ошибок по классу исключения',
+    ('exception',)
+))
+BREAKER_OPENED = REGISTRY.register(Counter(
+    'homework_breaker_opened_total',
+    'Сколько раз предохранитель сервиса размыкался',
+    ('upstream',)
+))
+COALESCED = REGISTRY.register(Counter(
+    'homework_coalesced_calls_total',
+    'Вызовы, дождавшиеся такого же запроса или опроса вместо своего'
+))
+CACHED_ANSWERS = REGISTRY.register(Counter(
+    'homework_cached_answers_total',
+    'Ответы API, разбор которых пропущен: 304 или тот же ответ',
+    ('reason',)
+))
+BACKLOG = REGISTRY.register(Gauge(
+    'homework_send_backlog',
+    'Число сообщений в очереди на отправку'
+))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдает метрики по адресу /metrics."""
+
+    registry = REGISTRY
+
+    def do_GET(self):
+        """Отвечает текстом метрик."""
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Не пишет каждый запрос в stderr."""
+        pass
+
+
+def serve(port=METRICS_PORT, host=METRICS_HOST):
+    """Запускает HTTP-сервер метрик в фоновом потоке."""
+    if port in (None, ''):
+        return None
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever,
+        name='metrics',
+        daemon=True
+    ).start()
+    return server
@@ -0,0 +1,151 @@
+from email.utils import parsedate_to_datetime
+import heapq
+import itertools
+import os
+import threading
+import time
+
+GLOBAL_RATE = float(os.getenv('API_GLOBAL_RATE', 20))
+GLOBAL_BURST = float(os.getenv('API_GLOBAL_BURST', 40))
+TOKEN_RATE = float(os.getenv('API_TOKEN_RATE', 1 / 30))
+TOKEN_BURST = float(os.getenv('API_TOKEN_BURST', 2))
+MAX_WAIT = 3600
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = now
+
+    def refill(self, now):
+        """Начисляет токены за время, прошедшее с прошлого обращения."""
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+    def delay(self, now):
+        """Возвращает, сколько секунд ждать до появления токена."""
+        self.refill(now)
+        wait = max(self.blocked_until - now, 0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now):
+        """Забирает токен, если он есть; иначе возвращает время ожидания."""
+        wait = self.delay(now)
+        if not wait:
+            self.tokens -= 1
+        return wait
+
+    def block(self, until):
+        """Запрещает выдачу токенов до момента until."""
+        self.blocked_until = max(self.blocked_until, until)
+
+
+class RateLimiter:
+    """Общий и поаккаунтный лимит запросов к API.
+
+    Ожидающие вызовы получают глобальный токен в порядке приоритета
+    (меньше — раньше), а при равном приоритете — в порядке очереди.
+    """
+
+    def __init__(self, rate=GLOBAL_RATE, burst=GLOBAL_BURST,
+                 key_rate=TOKEN_RATE, key_burst=TOKEN_BURST,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self._global = TokenBucket(rate, burst, clock())
+        self._keys = {}
+        self._waiters = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def _bucket(self, key, now):
+        bucket = self._keys.get(key)
+        if bucket is None:
+            bucket = self._keys[key] = TokenBucket(
+                self.key_rate, self.key_burst, now
+            )
+        return bucket
+
+    def _take_key(self, key):
+        while True:
+            with self._condition:
+                wait = self._bucket(key, self.clock()).take(self.clock())
+            if not wait:
+                return
+            time.sleep(min(wait, MAX_WAIT))
+
+    def acquire(self, key=None, priority=0):
+        """Блокирует вызов, пока лимиты не позволят сделать запрос."""
+        if key is not None:
+            self._take_key(key)
+        with self._condition:
+            entry = (priority, next(self._counter))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    wait = None
+                    if self._waiters[0] == entry:
+                        wait = self._global.take(self.clock())
+                        if not wait:
+                            return
+                    self._condition.wait(wait)
+            finally:
+                if self._waiters[0] == entry:
+                    heapq.heappop(self._waiters)
+                else:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def retry_after(self, delay, key=None):
+        """Приостанавливает запросы на delay секунд по ответу сервера."""
+        with self._condition:
+            until = self.clock() + min(delay, MAX_WAIT)
+            if key is None:
+                self._global.block(until)
+            else:
+                self._bucket(key, self.clock()).block(until)
+            self._condition.notify_all()
+
+    def budget(self, key=None):
+        """Возвращает число доступных сейчас токенов."""
+        with self._condition:
+            now = self.clock()
+            if key is None:
+                bucket = self._global
+            else:
+                bucket = self._keys.get(key)
+                if bucket is None:
+                    return self.key_burst
+            bucket.refill(now)
+            return 0 if bucket.blocked_until > now else bucket.tokens
+
+
+def parse_retry_after(value, now=None):
+    """Переводит заголовок Retry-After в секунды ожидания."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(moment.timestamp() - now, 0)
@@ -0,0 +1,33 @@
+import sys
+
+STATUSES = {status: status for status in ('approved', 'reviewing', 'rejected')}
+
+
+def intern_status(status):
+    """Возвращает единственный экземпляр строки статуса."""
+    return STATUSES.get(status) or sys.intern(status)
+
+
+class Homework:
+    """Домашка из ответа API: только поля, нужные для уведомлений."""
+
+    __slots__ = ('name', 'status')
+
+    def __init__(self, name, status):
+        self.name = name
+        self.status = intern_status(status)
+
+    def __repr__(self):
+        return f'Homework({self.name!r}, {self.status!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return (self.name, self.status) == (other.name, other.status)
+
+    @classmethod
+    def from_api(cls, data):
+        """Создает запись из словаря домашки в ответе API."""
+        if isinstance(data, cls):
+            return data
+        return cls(data['homework_name'], data['status'])
@@ -0,0 +1,31 @@
+from functools import lru_cache
+import os
+
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', 4096))
+
+
+class Renderer:
+    """Форматирует уведомление по (название, статус) с LRU-кешем.
+
+    Одинаковые переходы в разных чатах форматируются один раз. Если задан
+    шаблон unknown, неизвестный статус подставляется в него вместо KeyError.
+    """
+
+    def __init__(self, template, verdicts, cache_size=RENDER_CACHE_SIZE,
+                 unknown=None):
+        self.template = template
+        self.verdicts = verdicts
+        self.unknown = unknown
+        self.render = lru_cache(maxsize=cache_size)(self._render)
+
+    def _render(self, name, status):
+        verdict = self.verdicts.get(status)
+        if verdict is None:
+            if self.unknown is None:
+                raise KeyError(status)
+            verdict = self.unknown.format(status=status)
+        return self.template.format(name=name, verdict=verdict)
+
+    def cache_info(self):
+        """Возвращает статистику кеша."""
+        return self.render.cache_info()
@@ -0,0 +1,116 @@
+import concurrent.futures
+from itertools import islice
+import multiprocessing
+import os
+import threading
+
+from catalogs import get_catalog
+import diff
+from records import Homework
+
+RENDER_POOL = os.getenv('RENDER_POOL', '')
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', os.cpu_count() or 1))
+RENDER_BATCH = int(os.getenv('RENDER_BATCH', 500))
+EXECUTORS = {
+    'thread': 'ThreadPoolExecutor',
+    'process': 'ProcessPoolExecutor',
+}
+START_METHOD = (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+    else 'spawn'
+)
+
+UNKNOWN_POOL = 'RENDER_POOL должен быть одним из {kinds}, получено {kind}'
+
+_pool = None
+_lock = threading.Lock()
+
+
+def prepare(known, homeworks, language=None):
+    """Проверяет домашки и готовит уведомления о смене статусов.
+
+    Возвращает список четверок (название, статус, прежний статус, текст).
+    Работает и в дочернем процессе: принимает и отдает только простые типы.
+    """
+    catalog = get_catalog(language)
+    return [
+        (
+            homework.name,
+            homework.status,
+            previous,
+            catalog.render(homework.name, homework.status)
+        )
+        for homework, previous in diff.transitions(
+            known,
+            map(Homework.from_api, homeworks)
+        )
+    ]
+
+
+def batches(items, size):
+    """Нарезает итерируемое на списки по size элементов."""
+    iterator = iter(items)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+class RenderPool:
+    """Пул, в котором пачки домашек проверяются и форматируются.
+
+    Пачки отправляются в пул по мере чтения ответа, поэтому разбор
+    большого ответа идет параллельно с его загрузкой. Процессы пула
+    запускаются через START_METHOD, а не fork: пул создается, когда
+    потоки доставки, аренды и журнала уже работают, и при fork дочерний
+    процесс унаследовал бы захваченные ими блокировки.
+    """
+
+    def __init__(self, kind=RENDER_POOL, workers=RENDER_WORKERS,
+                 batch=RENDER_BATCH):
+        if kind not in EXECUTORS:
+            raise ValueError(UNKNOWN_POOL.format(
+                kinds=', '.join(EXECUTORS), kind=kind
+            ))
+        self.batch = batch
+        executor = getattr(concurrent.futures, EXECUTORS[kind])
+        if kind == 'process':
+            self.executor = executor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(START_METHOD)
+            )
+        else:
+            self.executor = executor(max_workers=workers)
+
+    def prepare(self, known, homeworks, language=None):
+        """Готовит уведомления так же, как prepare, но пачками в пуле."""
+        known = dict(known)
+        futures = [
+            self.executor.submit(prepare, known, batch, language)
+            for batch in batches(homeworks, self.batch)
+        ]
+        return [item for future in futures for item in future.result()]
+
+    def close(self):
+        """Дожидается начатых пачек и останавливает пул."""
+        self.executor.shutdown()
+
+
+def get_pool():
+    """Возвращает общий пул или None, если RENDER_POOL не задан."""
+    global _pool
+    if not RENDER_POOL:
+        return None
+    with _lock:
+        if _pool is None:
+            _pool = RenderPool()
+    return _pool
+
+
+def shutdown():
+    """Останавливает общий пул, если он был создан."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+FAST_INTERVAL = float(os.getenv('POLL_FAST_INTERVAL', 45))
+MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 1800))
+BACKOFF_FACTOR = float(os.getenv('POLL_BACKOFF_FACTOR', 2))
+JITTER = float(os.getenv('POLL_JITTER', 0.1))
+
+
+class Backoff:
+    """Подбирает интервал опроса аккаунта по его активности."""
+
+    def __init__(self, base, fast=FAST_INTERVAL, maximum=MAX_INTERVAL,
+                 factor=BACKOFF_FACTOR, jitter=JITTER, rand=random.random):
+        self.base = base
+        self.fast = min(fast, base)
+        self.maximum = max(maximum, base)
+        self.factor = factor
+        self.jitter = jitter
+        self.rand = rand
+
+    def next(self, previous, changed, busy):
+        """Возвращает следующий интервал опроса без случайного разброса.
+
+        Пока работа на проверке, аккаунт опрашивается часто; после
+        изменения интервал возвращается к базовому, а без изменений
+        растет экспоненциально до maximum.
+        """
+        if busy:
+            return self.fast
+        if changed or not previous:
+            return self.base
+        return min(max(previous, self.base) * self.factor, self.maximum)
+
+    def spread(self, interval):
+        """Добавляет к интервалу случайный разброс ±jitter."""
+        return interval * (1 + self.jitter * (2 * self.rand() - 1))
+
+
+class Scheduler:
+    """Очередь опроса: каждый элемент вызывается раз в interval секунд.
+
+    Элементы можно добавлять и убирать из других потоков. Убранный
+    элемент, который как раз обрабатывается, в очередь больше не
+    возвращается.
+    """
+
+    def __init__(self, interval, clock=time.monotonic, sleep=None,
+                 on_lag=None):
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep or self._wait
+        self.on_lag = on_lag
+        self._queue = []
+        self._entries = {}
+        self._members = set()
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._changed = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def schedule(self, item, delay=0):
+        """Ставит элемент в очередь через delay секунд."""
+        with self._condition:
+            self._members.add(item)
+            self._push(item, delay)
+
+    def reschedule(self, item, delay):
+        """Возвращает обработанный элемент в очередь, если его не убрали."""
+        with self._condition:
+            if item in self._members and item not in self._entries:
+                self._push(item, delay)
+
+    def spread(self, items):
+        """Равномерно распределяет первый опрос элементов по интервалу."""
+        items = list(items)
+        step = self.interval / max(len(items), 1)
+        with self._condition:
+            for index, item in enumerate(items):
+                self.schedule(item, index * step)
+            self._changed = True
+            self._condition.notify_all()
+
+    def add(self, items):
+        """Добавляет в очередь новые элементы, распределяя их по интервалу."""
+        with self._condition:
+            self.spread(
+                item for item in items if item not in self._members
+            )
+
+    def remove(self, items):
+        """Убирает элементы из очереди."""
+        with self._condition:
+            for item in items:
+                self._members.discard(item)
+                self._entries.pop(item, None)
+
+    def next_delay(self):
+        """Возвращает, сколько секунд осталось до ближайшего элемента.
+
+        Для пустой очереди возвращает None.
+        """
+        with self._condition:
+            if not self._drop_stale():
+                return None
+            return self._queue[0][0] - self.clock()
+
+    def pop(self):
+        """Извлекает ближайший элемент очереди или None, если она пуста."""
+        with self._condition:
+            if not self._drop_stale():
+                return None
+            when, _, item = heapq.heappop(self._queue)
+            del self._entries[item]
+        if self.on_lag is not None:
+            self.on_lag(max(self.clock() - when, 0))
+        return item
+
+    def run_once(self, callback):
+        """Обрабатывает ближайший элемент и ставит его в очередь снова.
+
+        Если callback вернул число, оно используется как задержка до
+        следующего вызова вместо interval. Если ожидание прервано
+        добавлением элементов, ничего не обрабатывает.
+        """
+        delay = self.next_delay()
+        if delay is None or delay > 0:
+            self.sleep(delay)
+            delay = self.next_delay()
+            if delay is None or delay > 0:
+                return
+        item = self.pop()
+        delay = self.interval
+        try:
+            result = callback(item)
+            if result is not None:
+                delay = result
+        finally:
+            self.reschedule(item, delay)
+
+    def run(self, callback):
+        """Бесконечно обрабатывает очередь опроса."""
+        while True:
+            self.run_once(callback)
+
+    def _push(self, item, delay):
+        entry = (self.clock() + delay, next(self._counter), item)
+        self._entries[item] = entry[1]
+        heapq.heappush(self._queue, entry)
+
+    def _drop_stale(self):
+        """Снимает с головы кучи записи убранных и переставленных элементов."""
+        while self._queue:
+            _, number, item = self._queue[0]
+            if self._entries.get(item) == number:
+                return True
+            heapq.heappop(self._queue)
+        return False
+
+    def _wait(self, delay):
+        with self._condition:
+            self._condition.wait_for(lambda: self._changed, delay)
+            self._changed = False
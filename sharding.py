@@ -0,0 +1,316 @@
+from bisect import bisect
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from logs import lazy
+from storage import SQLiteStore
+
+SHARD_PATH = os.getenv('SHARD_PATH')
+SHARD_WORKER = os.getenv(
+    'SHARD_WORKER',
+    '{host}:{pid}'.format(host=socket.gethostname(), pid=os.getpid())
+)
+SHARD_TTL = float(os.getenv('SHARD_TTL', 30))
+SHARD_VNODES = int(os.getenv('SHARD_VNODES', 64))
+
+SHARD_STORE = (
+    'Для шардирования нужна общая база SQLite в CHECKPOINT_PATH, '
+    'получено {store}'
+)
+REBALANCED = (
+    'Воркер {worker}: живых воркеров {workers}, аккаунтов {owned}, '
+    'получено {gained}, отдано {dropped}'
+)
+HEARTBEAT_FAILED = 'Не удалось продлить аренду аккаунтов: {error}'
+
+logger = logging.getLogger(__name__)
+
+
+def ring_point(value):
+    """Возвращает позицию значения на кольце хешей."""
+    return int(hashlib.sha256(value.encode()).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """Консистентное кольцо хешей: ключ принадлежит ближайшему воркеру.
+
+    Каждый воркер занимает vnodes точек, поэтому при входе или уходе
+    воркера переезжает только его доля ключей.
+    """
+
+    def __init__(self, workers, vnodes=SHARD_VNODES):
+        points = sorted(
+            (ring_point('{}#{}'.format(worker, index)), worker)
+            for worker in workers
+            for index in range(vnodes)
+        )
+        self._points = [point for point, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    def owner(self, key):
+        """Возвращает воркера, которому принадлежит ключ."""
+        if not self._points:
+            return None
+        index = bisect(self._points, ring_point(key)) % len(self._points)
+        return self._workers[index]
+
+
+class LeaseTable:
+    """Таблица аренды в SQLite, общая для воркеров на одной машине или диске.
+
+    Воркер продлевает свою запись и аренду своих аккаунтов каждые ttl / 3
+    секунд; записи, не продленные за ttl секунд, считаются брошенными.
+    """
+
+    def __init__(self, path, worker=SHARD_WORKER, ttl=SHARD_TTL,
+                 clock=time.time):
+        self.worker = worker
+        self.ttl = ttl
+        self.clock = clock
+        self.connection = sqlite3.connect(
+            path, timeout=ttl / 3, check_same_thread=False
+        )
+        self.connection.executescript(
+            'PRAGMA journal_mode=WAL;'
+            'CREATE TABLE IF NOT EXISTS workers ('
+            ' worker TEXT PRIMARY KEY,'
+            ' expires REAL NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS leases ('
+            ' tenant TEXT PRIMARY KEY,'
+            ' worker TEXT NOT NULL,'
+            ' expires REAL NOT NULL);'
+        )
+
+    def heartbeat(self):
+        """Продлевает запись воркера и возвращает список живых воркеров."""
+        now = self.clock()
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO workers VALUES (?, ?)',
+                (self.worker, now + self.ttl)
+            )
+            self.connection.execute(
+                'DELETE FROM workers WHERE expires < ?', (now,)
+            )
+            return sorted(
+                worker for worker, in self.connection.execute(
+                    'SELECT worker FROM workers'
+                )
+            )
+
+    def claim(self, keys):
+        """Берет в аренду свободные или свои аккаунты.
+
+        Возвращает множество ключей, которыми воркер владеет после вызова.
+        """
+        now = self.clock()
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO leases VALUES (?, ?, ?) '
+                'ON CONFLICT (tenant) DO UPDATE SET '
+                ' worker = excluded.worker, expires = excluded.expires '
+                'WHERE leases.worker = excluded.worker OR leases.expires < ?',
+                [(key, self.worker, now + self.ttl, now) for key in keys]
+            )
+            return {
+                key for key, in self.connection.execute(
+                    'SELECT tenant FROM leases WHERE worker = ?',
+                    (self.worker,)
+                )
+            }
+
+    def release(self, keys):
+        """Отдает аренду аккаунтов до истечения ее срока."""
+        with self.connection:
+            self.connection.executemany(
+                'DELETE FROM leases WHERE tenant = ? AND worker = ?',
+                [(key, self.worker) for key in keys]
+            )
+
+    def leave(self):
+        """Снимает воркера и всю его аренду."""
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM leases WHERE worker = ?', (self.worker,)
+            )
+            self.connection.execute(
+                'DELETE FROM workers WHERE worker = ?', (self.worker,)
+            )
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        self.connection.close()
+
+
+class Shard:
+    """Доля аккаунтов, которую опрашивает этот воркер.
+
+    Аккаунт опрашивается, только пока воркер держит его аренду. Перед
+    тем как отдать аккаунт, воркер дожидается текущих опросов и доставки
+    уведомлений из очереди и сбрасывает курсоры на диск, а новый владелец
+    перечитывает их при получении.
+    """
+
+    def __init__(self, leases, tenants, store=None, vnodes=SHARD_VNODES):
+        self.leases = leases
+        self.tenants = tenants
+        self.store = store
+        self.vnodes = vnodes
+        self.interval = leases.ttl / 3
+        self.owned = frozenset()
+        self.draining = frozenset()
+        self.valid_until = 0.0
+        self._active = 0
+        self._listener = None
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @contextmanager
+    def lease(self, tenant):
+        """Держит аккаунт за воркером на время опроса.
+
+        Отдает True, если аккаунт принадлежит воркеру и его можно опрашивать.
+        """
+        with self._condition:
+            owned = (
+                tenant.key in self.owned
+                and self.leases.clock() < self.valid_until
+            )
+            if owned:
+                self._active += 1
+        try:
+            yield owned
+        finally:
+            if owned:
+                with self._condition:
+                    self._active -= 1
+                    self._condition.notify_all()
+
+    def subscribe(self, listener):
+        """Сообщает listener(полученные, отданные) о смене доли аккаунтов.
+
+        Сразу передает текущую долю как полученную, затем вызывается после
+        каждой перебалансировки, изменившей долю.
+        """
+        with self._condition:
+            self._listener = listener
+            listener(self._tenants(self.owned), [])
+
+    def _tenants(self, keys):
+        return [tenant for tenant in self.tenants if tenant.key in keys]
+
+    def holds(self, tenant):
+        """Проверяет, что аренда аккаунта еще у воркера.
+
+        Отдаваемый аккаунт не опрашивается, но его аренда держится,
+        пока не доставлены уведомления из очереди.
+        """
+        with self._condition:
+            return tenant.key in self.owned or tenant.key in self.draining
+
+    def _drop(self, keys):
+        with self._condition:
+            self.owned = self.owned - keys
+            self.draining = self.draining | keys
+            self._condition.wait_for(lambda: not self._active)
+
+    def _release(self):
+        """Отдает аренду аккаунтов, у которых нет уведомлений в очереди.
+
+        Иначе новый владелец отправил бы их снова, а поздняя доставка
+        перезаписала бы его курсор.
+        """
+        settled = {
+            tenant.key for tenant in self._tenants(self.draining)
+            if not tenant.pending
+        }
+        if not settled:
+            return
+        if self.store is not None:
+            self.store.flush()
+        self.leases.release(settled)
+        with self._condition:
+            self.draining = self.draining - settled
+
+    def rebalance(self):
+        """Продлевает аренду и перераспределяет аккаунты между воркерами.
+
+        Возвращает множества полученных и отданных ключей.
+        """
+        started = self.leases.clock()
+        workers = self.leases.heartbeat()
+        ring = HashRing(workers, self.vnodes)
+        wanted = {
+            tenant.key for tenant in self.tenants
+            if ring.owner(tenant.key) == self.leases.worker
+        }
+        dropped = self.owned - wanted
+        if dropped:
+            self._drop(dropped)
+        self._release()
+        owned = frozenset(
+            self.leases.claim(wanted | self.draining) & wanted
+        )
+        gained = owned - self.owned
+        restored = gained - self.draining
+        if restored and self.store is not None:
+            self.store.restore(self._tenants(restored))
+        with self._condition:
+            self.owned = owned
+            self.draining = self.draining - owned
+            self.valid_until = started + self.leases.ttl
+            if self._listener is not None and (gained or dropped):
+                self._listener(self._tenants(gained), self._tenants(dropped))
+        if gained or dropped:
+            logger.info(lazy(
+                REBALANCED,
+                worker=self.leases.worker,
+                workers=len(workers),
+                owned=len(owned),
+                gained=len(gained),
+                dropped=len(dropped)
+            ))
+        return gained, dropped
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.rebalance()
+            except sqlite3.Error as error:
+                logger.warning(lazy(HEARTBEAT_FAILED, error=error))
+
+    def start(self):
+        """Берет первую долю аккаунтов и запускает продление аренды."""
+        self.rebalance()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Останавливает продление, сбрасывает курсоры и отдает аккаунты."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._drop(self.owned)
+        if self.store is not None:
+            self.store.flush()
+        with self._condition:
+            self.draining = frozenset()
+        self.leases.leave()
+        self.leases.close()
+
+
+def open_shard(tenants, store, path=SHARD_PATH):
+    """Запускает шардирование, если задан путь к таблице аренды."""
+    if not path:
+        return None
+    if not isinstance(store, SQLiteStore):
+        raise ValueError(SHARD_STORE.format(store=type(store).__name__))
+    return Shard(LeaseTable(path), tenants, store).start()
@@ -0,0 +1,237 @@
+from abc import ABC, abstractmethod
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from records import intern_status
+
+CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH')
+FLUSH_INTERVAL = float(os.getenv('CHECKPOINT_FLUSH_INTERVAL', 5))
+FLUSH_BATCH = int(os.getenv('CHECKPOINT_FLUSH_BATCH', 500))
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+COMPACT_RATIO = 2
+
+
+class Checkpoint:
+    """Сохраненное состояние аккаунта: курсор и статусы домашек."""
+
+    __slots__ = ('current_date', 'homeworks')
+
+    def __init__(self, current_date, homeworks=None):
+        self.current_date = current_date
+        self.homeworks = homeworks or {}
+
+
+class CheckpointStore(ABC):
+    """Буферизует изменения и пачкой сбрасывает их на диск."""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, batch=FLUSH_BATCH,
+                 clock=time.monotonic):
+        self.flush_interval = flush_interval
+        self.batch = batch
+        self.clock = clock
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flushed_at = clock()
+
+    @abstractmethod
+    def load(self):
+        """Возвращает словарь ключ аккаунта -> Checkpoint."""
+
+    @abstractmethod
+    def _write(self, batch):
+        """Записывает пачку словаря ключ аккаунта -> Checkpoint."""
+
+    def restore(self, tenants):
+        """Восстанавливает курсоры и статусы аккаунтов из хранилища."""
+        with self._lock:
+            checkpoints = self.load()
+        for tenant in tenants:
+            checkpoint = checkpoints.get(tenant.key)
+            if checkpoint is not None:
+                tenant.current_date = checkpoint.current_date
+                tenant.homeworks.update(
+                    (name, intern_status(status))
+                    for name, status in checkpoint.homeworks.items()
+                )
+
+    def save(self, tenant):
+        """Запоминает состояние аккаунта до ближайшего сброса на диск."""
+        with self._lock:
+            self._pending[tenant.key] = Checkpoint(
+                tenant.current_date,
+                dict(tenant.homeworks)
+            )
+            due = (
+                len(self._pending) >= self.batch
+                or self.clock() - self._flushed_at >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные изменения одной транзакцией."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._flushed_at = self.clock()
+            if batch:
+                self._write(batch)
+
+    def close(self):
+        """Сбрасывает буфер и освобождает ресурсы."""
+        self.flush()
+
+
+class SQLiteStore(CheckpointStore):
+    """Хранилище состояния в базе SQLite."""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=FULL;'
+            'CREATE TABLE IF NOT EXISTS checkpoints ('
+            ' tenant TEXT PRIMARY KEY,'
+            ' from_date INTEGER NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS homeworks ('
+            ' tenant TEXT NOT NULL,'
+            ' name TEXT NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' PRIMARY KEY (tenant, name));'
+        )
+
+    def load(self):
+        """Возвращает словарь ключ аккаунта -> Checkpoint."""
+        checkpoints = {
+            tenant: Checkpoint(from_date)
+            for tenant, from_date in self.connection.execute(
+                'SELECT tenant, from_date FROM checkpoints'
+            )
+        }
+        for tenant, name, status in self.connection.execute(
+            'SELECT tenant, name, status FROM homeworks'
+        ):
+            if tenant in checkpoints:
+                checkpoints[tenant].homeworks[name] = status
+        return checkpoints
+
+    def _write(self, batch):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO checkpoints VALUES (?, ?)',
+                [(key, item.current_date) for key, item in batch.items()]
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO homeworks VALUES (?, ?, ?)',
+                [
+                    (key, name, status)
+                    for key, item in batch.items()
+                    for name, status in item.homeworks.items()
+                ]
+            )
+
+    def close(self):
+        """Сбрасывает буфер и закрывает соединение с базой."""
+        super().close()
+        self.connection.close()
+
+
+class FileStore(CheckpointStore):
+    """Хранилище состояния в журнале JSON-строк, дописываемом в конец.
+
+    Журнал сжимается до одной записи на аккаунт при загрузке и каждый раз,
+    когда вырастает больше чем в COMPACT_RATIO раз относительно последних
+    записей аккаунтов.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._file = None
+        self._lines = {}
+        self._live = 0
+        self._written = 0
+
+    def load(self):
+        """Читает журнал и сжимает его до одной записи на аккаунт."""
+        checkpoints = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    checkpoints[record['tenant']] = Checkpoint(
+                        record['current_date'],
+                        record['homeworks']
+                    )
+        self._lines = {}
+        self._live = 0
+        self._remember(self._serialize(checkpoints))
+        self._compact()
+        return checkpoints
+
+    def _serialize(self, batch):
+        return {
+            key: json.dumps(
+                {
+                    'tenant': key,
+                    'current_date': item.current_date,
+                    'homeworks': item.homeworks
+                },
+                ensure_ascii=False
+            ) + '\n'
+            for key, item in batch.items()
+        }
+
+    def _remember(self, lines):
+        for key, line in lines.items():
+            self._live += len(line) - len(self._lines.get(key, ''))
+            self._lines[key] = line
+
+    def _compact(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            self._dump(file, self._lines.values())
+        os.replace(temporary, self.path)
+        self._written = self._live
+
+    def _dump(self, file, lines):
+        file.writelines(lines)
+        file.flush()
+        os.fsync(file.fileno())
+
+    def _write(self, batch):
+        lines = self._serialize(batch)
+        self._remember(lines)
+        size = sum(len(line) for line in lines.values())
+        if self._written + size > COMPACT_RATIO * self._live:
+            self._compact()
+            return
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._dump(self._file, lines.values())
+        self._written += size
+
+    def close(self):
+        """Сбрасывает буфер и закрывает файл журнала."""
+        super().close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_store(path=CHECKPOINT_PATH):
+    """Открывает хранилище: SQLite по расширению файла, иначе журнал."""
+    if not path:
+        return None
+    if path.endswith(SQLITE_SUFFIXES):
+        return SQLiteStore(path)
+    return FileStore(path)
@@ -0,0 +1,123 @@
+import codecs
+import json
+
+COMPACT_AFTER = 65536
+WHITESPACE = ' \t\n\r'
+
+NOT_OBJECT = 'Ответ API не JSON-объект: {found}'
+NOT_ARRAY = 'Значение по ключу "{key}" не список: {found}'
+MISSING_KEY = 'Данные по ключу "{key}" отсутствуют'
+UNEXPECTED = 'Неожиданный символ {char!r} в ответе API на позиции {position}'
+TRUNCATED = 'Ответ API оборвался до конца JSON-документа'
+
+_decoder = json.JSONDecoder()
+
+
+class ObjectStream:
+    """Потоково разбирает JSON-объект из кусков байтов.
+
+    Итерация отдает элементы списка по ключу key по одному, не загружая
+    документ целиком. Остальные поля верхнего уровня складываются в fields
+    и передаются в on_field сразу после разбора.
+    """
+
+    def __init__(self, chunks, key, on_field=None, close=None):
+        self.key = key
+        self.fields = {}
+        self.on_field = on_field
+        self._close = close
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+
+    def __iter__(self):
+        try:
+            yield from self._object()
+        finally:
+            if self._close is not None:
+                self._close()
+
+    def _fill(self):
+        if self._eof:
+            return False
+        if self._position > COMPACT_AFTER:
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer += self._decode.decode(chunk)
+                return True
+        self._buffer += self._decode.decode(b'', final=True)
+        self._eof = True
+        return True
+
+    def _peek(self):
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in WHITESPACE
+            ):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                raise ValueError(TRUNCATED)
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(
+                UNEXPECTED.format(char=char, position=self._position)
+            )
+        self._position += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if end < len(self._buffer) or self._eof:
+                self._position = end
+                return value
+            self._fill()
+
+    def _array(self):
+        self._position += 1
+        if self._peek() == ']':
+            self._position += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                return
+
+    def _object(self):
+        if self._peek() != '{':
+            raise TypeError(NOT_OBJECT.format(found=type(self._value())))
+        self._position += 1
+        found = False
+        while self._peek() != '}':
+            name = self._value()
+            self._expect(':')
+            if name == self.key:
+                found = True
+                if self._peek() != '[':
+                    raise TypeError(
+                        NOT_ARRAY.format(key=name, found=type(self._value()))
+                    )
+                yield from self._array()
+            else:
+                self.fields[name] = self._value()
+                if self.on_field is not None:
+                    self.on_field(name, self.fields[name])
+            if self._expect(',}') == '}':
+                break
+        if not found:
+            raise KeyError(MISSING_KEY.format(key=self.key))
@@ -0,0 +1,89 @@
+import hashlib
+import json
+
+from catalogs import get_catalog
+
+AUTHORIZATION = 'OAuth {token}'
+
+TENANTS_NOT_LIST = 'Файл {path} должен содержать список аккаунтов'
+TENANT_DUPLICATE = 'Аккаунт с чатом {chat_id} указан повторно'
+
+
+def tenant_key(token):
+    """Возвращает ключ аккаунта, по которому нельзя восстановить токен."""
+    return hashlib.sha256(str(token).encode()).hexdigest()[:16]
+
+
+class Tenant:
+    """Аккаунт студента: токен Практикума, чат и курсор опроса."""
+
+    __slots__ = (
+        'token', 'key', 'chat_id', 'headers', 'current_date',
+        'homeworks', 'interval', 'catalog', 'error_message', 'pending',
+        'queued'
+    )
+
+    def __init__(self, token, chat_id, current_date=0, language=None):
+        self.token = token
+        self.key = tenant_key(token)
+        self.chat_id = chat_id
+        self.headers = {'Authorization': AUTHORIZATION.format(token=token)}
+        self.current_date = current_date
+        self.homeworks = {}
+        self.interval = 0
+        self.catalog = get_catalog(language)
+        self.error_message = ''
+        self.pending = 0
+        self.queued = {}
+
+    def __repr__(self):
+        return f'Tenant(chat_id={self.chat_id!r})'
+
+
+class TenantRegistry:
+    """Реестр аккаунтов, которые опрашиваются одним процессом."""
+
+    def __init__(self, tenants=()):
+        self._tenants = {}
+        for tenant in tenants:
+            self.add(tenant)
+
+    def add(self, tenant):
+        """Добавляет аккаунт в реестр."""
+        if tenant.token in self._tenants:
+            raise ValueError(TENANT_DUPLICATE.format(chat_id=tenant.chat_id))
+        self._tenants[tenant.token] = tenant
+
+    def remove(self, token):
+        """Удаляет аккаунт из реестра."""
+        return self._tenants.pop(token, None)
+
+    def get(self, token):
+        """Возвращает аккаунт по токену Практикума."""
+        return self._tenants.get(token)
+
+    def __iter__(self):
+        return iter(list(self._tenants.values()))
+
+    def __len__(self):
+        return len(self._tenants)
+
+    @classmethod
+    def load(cls, path, current_date=0):
+        """Загружает аккаунты из JSON-файла со списком token/chat_id.
+
+        Необязательное поле language выбирает каталог сообщений аккаунта.
+        """
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        if not isinstance(data, list):
+            raise TypeError(TENANTS_NOT_LIST.format(path=path))
+        return cls(
+            Tenant(
+                item['token'],
+                item['chat_id'],
+                current_date,
+                item.get('language')
+            )
+            for item in data
+        )
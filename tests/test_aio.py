@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import aio
+import homework
+from ratelimit import RateLimiter
+from tenants import Tenant
+from tests.test_diff import FakeResponse
+
+
+class SlowBot:
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+
+
+class GatedSession:
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.gate = threading.Event()
+        self.lock = threading.Lock()
+
+    def get(self, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.in_flight)
+        self.gate.wait(5)
+        with self.lock:
+            self.in_flight -= 1
+        return FakeResponse({'homeworks': [], 'current_date': 1})
+
+
+async def wait_for_calls(session, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while session.calls < count and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+class TestAio:
+
+    def test_send_to_chat_runs_concurrently(self):
+        bot = SlowBot()
+
+        async def fan_out():
+            return await asyncio.gather(*(
+                aio.async_send_to_chat(bot, chat_id, 'text')
+                for chat_id in range(10)
+            ))
+
+        started = time.monotonic()
+        results = asyncio.run(fan_out())
+        assert all(results)
+        assert bot.peak > 1, 'Отправки должны выполняться параллельно'
+        assert time.monotonic() - started < 0.5
+
+    def test_poll_forever_bounds_in_flight_polls(self, monkeypatch):
+        monkeypatch.setattr(homework, 'RETRY_TIME', 0.01)
+        session = GatedSession()
+        tenants = [Tenant(f'token{index}', index) for index in range(20)]
+
+        async def poll():
+            task = asyncio.create_task(aio.poll_forever(
+                SlowBot(), tenants,
+                limit=3,
+                session=session,
+                limiter=RateLimiter(1000, 1000, 1000, 1000)
+            ))
+            await wait_for_calls(session, 3)
+            await asyncio.sleep(0.05)
+            blocked = session.calls
+            session.gate.set()
+            await wait_for_calls(session, len(tenants))
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            return blocked
+
+        assert asyncio.run(poll()) == 3, 'Пока опросы висят, новые не идут'
+        assert session.calls >= len(tenants)
+        assert session.peak <= 3, 'В работе не больше limit опросов'
@@ -0,0 +1,80 @@
+import json
+
+from answer_cache import AnswerCache, CachedAnswer, body_digest
+import homework
+
+HOMEWORKS = [{'homework_name': 'hw1', 'status': 'approved'}]
+
+
+class CachedResponse:
+
+    def __init__(self, status_code=200, data=None, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode() if data else b''
+        self.data = data
+        self.headers = dict(headers or {})
+        self.headers['Content-Length'] = str(len(self.content))
+
+    def json(self):
+        return self.data
+
+    def close(self):
+        pass
+
+
+class CachedSession:
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, **kwargs):
+        self.requests.append(kwargs['headers'])
+        return self.responses.pop(0)
+
+
+class TestAnswerCache:
+
+    def test_body_digest_ignores_current_date(self):
+        first = body_digest(b'{"homeworks": [], "current_date": 1}')
+        second = body_digest(b'{"homeworks": [], "current_date": 22}')
+        assert first[0] == second[0]
+        assert (first[1], second[1]) == (1, 22)
+        assert body_digest(b'{}')[1] is None
+
+    def test_lru(self):
+        cache = AnswerCache(size=1)
+        cache.put('a', CachedAnswer(None, None, b'', [], {}))
+        cache.put('b', CachedAnswer(None, None, b'', [], {}))
+        assert cache.get('a') is None
+        assert len(cache) == 1
+
+    def test_conditional_and_same_body(self):
+        cache = AnswerCache()
+        session = CachedSession(
+            CachedResponse(
+                data={'homeworks': HOMEWORKS, 'current_date': 10},
+                headers={'ETag': '"v1"'}
+            ),
+            CachedResponse(304),
+            CachedResponse(304),
+            CachedResponse(data={'homeworks': HOMEWORKS, 'current_date': 20}),
+        )
+        homeworks, fields = homework.stream_homeworks(
+            {}, 0, session, cache, 'key'
+        )
+        assert homeworks == HOMEWORKS
+        homeworks, fields = homework.stream_homeworks(
+            {}, 10, session, cache, 'key'
+        )
+        assert session.requests[1]['If-None-Match'] == '"v1"'
+        assert homeworks == HOMEWORKS
+        assert fields == {'current_date': 10}
+        cache.commit('key')
+        homeworks, _ = homework.stream_homeworks({}, 10, session, cache, 'key')
+        assert not homeworks
+        homeworks, fields = homework.stream_homeworks(
+            {}, 10, session, cache, 'key'
+        )
+        assert not homeworks
+        assert fields['current_date'] == 20
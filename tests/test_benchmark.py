@@ -0,0 +1,10 @@
+from benchmarks import bench_pipeline
+
+
+class TestBenchmark:
+
+    def test_smoke(self):
+        report = bench_pipeline.run(tenants=4, homeworks=3, rounds=2,
+                                    concurrency=2, workers=2)
+        assert report['polls_per_sec'] > 0
+        assert report['p99_ms'] >= report['p50_ms'] > 0
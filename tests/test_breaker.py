@@ -0,0 +1,65 @@
+import pytest
+
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from exceptions import CircuitOpen
+import homework
+
+
+class TestBreaker:
+
+    def test_open_half_open_closed(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            'test', threshold=2, cooldown=10, clock=lambda: now[0]
+        )
+        breaker.failure()
+        assert breaker.allow()
+        breaker.failure()
+        assert breaker.state == OPEN
+        assert breaker.is_open()
+        with pytest.raises(CircuitOpen):
+            breaker.check()
+        now[0] = 10
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        breaker.success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            'test', threshold=1, cooldown=5, clock=lambda: now[0]
+        )
+        breaker.failure()
+        now[0] = 5
+        assert breaker.allow()
+        breaker.failure()
+        assert breaker.state == OPEN
+        assert breaker.remaining() == 5
+
+    def test_probe_settled_by_unexpected_error(self, monkeypatch):
+        class BrokenSession:
+            def get(self, **kwargs):
+                raise RuntimeError('boom')
+
+        now = [0.0]
+        breaker = CircuitBreaker(
+            'test', threshold=1, cooldown=5, clock=lambda: now[0]
+        )
+        monkeypatch.setattr(homework, 'API_BREAKER', breaker)
+        breaker.failure()
+        now[0] = 5
+        with pytest.raises(RuntimeError):
+            homework.request_homeworks({}, 0, BrokenSession())
+        assert breaker.state == OPEN
+        now[0] = 10
+        assert not breaker.is_open(), 'Пробный запрос должен завершиться'
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker('test', threshold=2)
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        assert breaker.state == CLOSED
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import catalogs
+import homework
+from tenants import Tenant, TenantRegistry
+
+
+class TestCatalogs:
+
+    def test_languages(self):
+        assert {'ru', 'en'} <= set(catalogs.CATALOGS)
+        english = catalogs.get_catalog('en')
+        assert english.render('hw1', 'approved').startswith(
+            'Review status of "hw1" has changed.'
+        )
+        assert catalogs.get_catalog('ru').render('hw1', 'rejected').endswith(
+            'Работа проверена: у ревьюера есть замечания.'
+        )
+
+    def test_homework_texts_come_from_catalog(self):
+        russian = catalogs.get_catalog('ru')
+        assert homework.HOMEWORK_VERDICTS == russian.verdicts
+        assert homework.PARSE_STATUS == russian.status_changed
+        assert homework.MESSAGE_ERROR == russian.error
+        assert homework.parse_status(
+            {'homework_name': 'hw1', 'status': 'approved'}
+        ) == russian.render('hw1', 'approved')
+
+    def test_unknown_status_fallback(self):
+        message = catalogs.get_catalog('en').render('hw1', 'on_hold')
+        assert message.endswith('Review status: on_hold.')
+
+    def test_template_fields_checked(self, tmp_path):
+        (tmp_path / 'xx.json').write_text(json.dumps({
+            'status_changed': '{name} {token}',
+            'unknown_status': '{status}',
+            'error': '{error}',
+            'verdicts': {},
+        }))
+        with pytest.raises(ValueError):
+            catalogs.load_catalogs(str(tmp_path))
+
+    def test_tenant_language(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1, 'language': 'en'},
+            {'token': 'b', 'chat_id': 2},
+        ]))
+        registry = TenantRegistry.load(str(path))
+        assert registry.get('a').catalog is catalogs.CATALOGS['en']
+        assert registry.get('b').catalog is catalogs.get_catalog()
+        assert Tenant('c', 3).catalog is catalogs.get_catalog()
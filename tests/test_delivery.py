@@ -0,0 +1,137 @@
+import threading
+import time
+
+import telegram
+
+from breaker import CLOSED, OPEN, CircuitBreaker
+from delivery import SEPARATOR, DeliveryQueue, split_messages
+from ratelimit import RateLimiter
+
+
+class RecordingBot:
+
+    def __init__(self, fail_first=False):
+        self.sent = []
+        self.fail_first = fail_first
+        self.gate = threading.Event()
+
+    def send_message(self, chat_id, text):
+        self.gate.wait(2)
+        if self.fail_first:
+            self.fail_first = False
+            raise telegram.error.RetryAfter(0)
+        self.sent.append((chat_id, text))
+
+
+class BlockedBot:
+
+    def __init__(self, blocked=()):
+        self.blocked = blocked
+        self.broken = False
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        if self.broken:
+            raise RuntimeError('broken')
+        if chat_id in self.blocked:
+            raise telegram.error.Unauthorized('bot was blocked by the user')
+        self.sent.append((chat_id, text))
+
+
+def unlimited():
+    return RateLimiter(rate=1000, burst=1000, key_rate=1000, key_burst=1000)
+
+
+class TestDelivery:
+
+    def test_split_messages(self):
+        messages = ['a' * 2000] * 5
+        parts = list(split_messages(messages))
+        assert len(parts) == 3
+        assert all(len(part) <= 4096 for part in parts)
+        assert SEPARATOR.join(parts) == SEPARATOR.join(messages)
+
+    def test_oversized_message_truncated(self):
+        parts = list(split_messages(['a' * 5000, 'b']))
+        assert [len(part) for part in parts] == [4096, 1]
+        assert parts[0].endswith('…')
+
+    def test_coalesces_per_chat_in_order(self):
+        bot = RecordingBot()
+        queue = DeliveryQueue(bot, workers=2, limiter=unlimited()).start()
+        queue.send_message(1, 'a')
+        queue.send_message(2, 'x')
+        queue.send_message(1, 'b')
+        queue.send_message(1, 'c')
+        assert queue.backlog() >= 2
+        bot.gate.set()
+        queue.close(2)
+        texts = {}
+        for chat_id, text in bot.sent:
+            texts.setdefault(chat_id, []).append(text)
+        assert SEPARATOR.join(texts[1]) == SEPARATOR.join('abc')
+        assert texts[2] == ['x']
+        assert queue.backlog() == 0
+
+    def test_retry_after(self):
+        bot = RecordingBot(fail_first=True)
+        bot.gate.set()
+        queue = DeliveryQueue(bot, workers=1, limiter=unlimited()).start()
+        queue.send_message(1, 'a')
+        deadline = time.monotonic() + 2
+        while not bot.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        queue.close(2)
+        assert bot.sent == [(1, 'a')]
+
+    def test_close_stops_retrying(self):
+        bot = BlockedBot()
+        bot.broken = True
+        results = []
+        queue = DeliveryQueue(bot, workers=2, limiter=unlimited()).start()
+        for chat_id in range(3):
+            queue.send_message(chat_id, 'a', callback=results.append)
+        time.sleep(0.05)
+        started = time.monotonic()
+        assert queue.close(2)
+        assert time.monotonic() - started < 1
+        assert results == [False] * 3
+        assert queue.backlog() == 0
+
+    def test_digest_window(self):
+        bot = RecordingBot()
+        bot.gate.set()
+        queue = DeliveryQueue(
+            bot, workers=2, limiter=unlimited(), window=0.2
+        ).start()
+        queue.send_message(1, 'a')
+        queue.send_message(1, 'b')
+        time.sleep(0.05)
+        queue.send_message(1, 'c')
+        assert not bot.sent
+        deadline = time.monotonic() + 2
+        while not bot.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert bot.sent == [(1, SEPARATOR.join('abc'))]
+        queue.close(2)
+
+    def test_probe_settled_by_non_network_error(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            'telegram', threshold=1, cooldown=10, clock=lambda: now[0]
+        )
+        bot = BlockedBot(blocked={2})
+        queue = DeliveryQueue(bot, limiter=unlimited(), breaker=breaker)
+        breaker.failure()
+        now[0] = 10
+        assert queue._deliver(2, 'a') is False
+        assert breaker.state == CLOSED
+        assert queue._deliver(3, 'b') is True
+        assert bot.sent == [(3, 'b')]
+        breaker.failure()
+        now[0] = 20
+        bot.broken = True
+        assert queue._deliver(3, 'c') is None
+        assert breaker.state == OPEN
+        now[0] = 30
+        assert breaker.allow()
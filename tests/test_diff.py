@@ -0,0 +1,177 @@
+import json
+
+from delivery import DeliveryQueue
+import diff
+import homework
+from ratelimit import RateLimiter
+from records import Homework
+from tenants import Tenant
+from tests.test_delivery import BlockedBot
+
+
+class FakeResponse:
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def iter_content(self, chunk_size):
+        body = json.dumps(self.data).encode()
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def get(self, **kwargs):
+        return FakeResponse(self.responses.pop(0))
+
+
+class FakeBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def response(*statuses, current_date=1):
+    return {
+        'homeworks': [
+            {'homework_name': name, 'status': status}
+            for name, status in statuses
+        ],
+        'current_date': current_date,
+    }
+
+
+class TestDiff:
+
+    def test_transitions(self):
+        known = {'hw1': 'reviewing', 'hw2': 'approved'}
+        homeworks = [
+            Homework(name, status)
+            for name, status in (
+                ('hw1', 'approved'), ('hw2', 'approved'), ('hw3', 'reviewing')
+            )
+        ]
+        changed = [
+            (item.name, previous)
+            for item, previous in diff.transitions(known, homeworks)
+        ]
+        assert changed == [('hw1', 'reviewing'), ('hw3', None)]
+
+    def test_poll_tenant_sends_only_transitions(self):
+        bot = FakeBot()
+        tenant = Tenant('token', 7)
+        session = FakeSession(
+            response(('hw1', 'reviewing'), ('hw2', 'reviewing')),
+            response(('hw1', 'reviewing'), ('hw2', 'approved'),
+                     current_date=2),
+        )
+        homework.poll_tenant(bot, tenant, session)
+        homework.poll_tenant(bot, tenant, session)
+        assert [text for _, text in bot.sent] == [
+            homework.parse_status(item)
+            for item in (
+                {'homework_name': 'hw1', 'status': 'reviewing'},
+                {'homework_name': 'hw2', 'status': 'reviewing'},
+                {'homework_name': 'hw2', 'status': 'approved'},
+            )
+        ]
+        assert tenant.homeworks == {'hw1': 'reviewing', 'hw2': 'approved'}
+        assert all(
+            status is Homework('x', status).status
+            for status in tenant.homeworks.values()
+        ), 'Статусы должны храниться в единственном экземпляре'
+        assert tenant.current_date == 2
+
+    def test_state_committed_only_after_delivery(self):
+        tenant = Tenant('token', 7)
+        answer = response(('hw1', 'approved'), current_date=5)
+        session = FakeSession(answer, answer)
+        blocked = BlockedBot(blocked={7})
+        queue = DeliveryQueue(blocked, limiter=RateLimiter(100, 100, 100, 100))
+        homework.poll_tenant(queue, tenant, session)
+        assert tenant.pending == 1
+        assert not homework.poll_tenant(queue, tenant, session)
+        assert len(session.responses) == 1
+        queue.start().close(2)
+        assert (tenant.pending, tenant.homeworks, tenant.current_date) == (
+            0, {}, 0
+        )
+        blocked.blocked = set()
+        queue = DeliveryQueue(blocked, limiter=RateLimiter(100, 100, 100, 100))
+        homework.poll_tenant(queue, tenant, session)
+        queue.start().close(2)
+        assert tenant.homeworks == {'hw1': 'approved'}
+        assert tenant.current_date == 5
+
+    def test_catch_up_sends_one_digest(self):
+        bot = FakeBot()
+        behind = Tenant('token', 7, current_date=0)
+        fresh = Tenant('fresh', 8, current_date=10 ** 6)
+        session = FakeSession(response(
+            ('hw1', 'reviewing'), ('hw2', 'approved'), ('hw1', 'approved'),
+            current_date=10 ** 6
+        ))
+        caught = homework.catch_up(bot, [behind, fresh], session, now=10 ** 6)
+        assert caught == 1
+        assert len(bot.sent) == 1
+        chat_id, text = bot.sent[0]
+        assert chat_id == 7
+        assert text.startswith(behind.catalog.digest.format(count=2))
+        assert behind.homeworks == {'hw1': 'approved', 'hw2': 'approved'}
+        assert behind.current_date == 10 ** 6
+
+    def test_latest_entry_wins_over_known_status(self):
+        for digest in (True, False):
+            bot = FakeBot()
+            tenant = Tenant('token', 7, current_date=0)
+            tenant.homeworks = {'hw1': 'approved', 'hw2': 'reviewing'}
+            session = FakeSession(response(
+                ('hw1', 'reviewing'), ('hw1', 'approved'),
+                ('hw2', 'rejected'), ('hw2', 'reviewing'), ('hw2', 'approved')
+            ))
+            homework.poll_tenant(bot, tenant, session, digest=digest)
+            assert tenant.homeworks == {'hw1': 'approved', 'hw2': 'approved'}
+            assert len(bot.sent) == 1
+            assert 'hw2' in bot.sent[0][1] and 'hw1' not in bot.sent[0][1]
+
+    def test_catch_up_logs_failed_tenant(self, monkeypatch, caplog):
+        def broken(*args):
+            raise RuntimeError('boom')
+
+        monkeypatch.setattr(homework, 'catch_up_tenant', broken)
+        behind = Tenant('token', 7, current_date=0)
+        assert homework.catch_up(FakeBot(), [behind], now=10 ** 6) == 1
+        failed = [
+            record for record in caplog.records
+            if record.getMessage()
+            == homework.CATCH_UP_FAILED.format(chat_id=7)
+        ]
+        assert failed and failed[0].exc_info[1].args == ('boom',)
+
+
+class TestRecords:
+
+    def test_homework_record(self):
+        record = Homework.from_api(
+            {'homework_name': 'hw', 'status': ''.join(['appr', 'oved'])}
+        )
+        assert record == Homework('hw', 'approved')
+        assert record.status is Homework('x', 'approved').status
+        assert not hasattr(record, '__dict__')
+        assert Homework.from_api(record) is record
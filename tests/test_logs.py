@@ -0,0 +1,110 @@
+import json
+import logging
+
+import homework
+import logs
+
+
+class Exploding:
+
+    def __format__(self, spec):
+        raise AssertionError('Сообщение не должно форматироваться')
+
+
+class TestLogs:
+
+    def test_lazy_message_is_not_formatted_when_filtered(self):
+        logger = logging.getLogger('test_logs.filtered')
+        logger.setLevel(logging.WARNING)
+        logger.info(logs.lazy('{value}', value=Exploding()))
+        assert str(logs.lazy('{a}-{b}', a=1, b=2)) == '1-2'
+
+    def test_enqueued_handlers_write_in_batches(self, tmp_path):
+        path = tmp_path / 'bot.log'
+        handler = logs.BatchRotatingFileHandler(
+            str(path), maxBytes=200, backupCount=2
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger = logging.getLogger('test_logs.queued')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        [writer] = logs.enqueue_handlers(logger)
+        assert isinstance(logger.handlers[0], logs.LazyQueueHandler)
+        for index in range(20):
+            logger.info(logs.lazy('запись {index:02}', index=index))
+        writer.stop()
+        handler.close()
+        text = ''.join(
+            file.read_text(encoding='utf-8')
+            for file in sorted(tmp_path.iterdir(), reverse=True)
+        )
+        assert 'запись 19' in text
+        assert (tmp_path / 'bot.log.1').exists(), 'Журнал должен ротироваться'
+
+    def test_json_formatter_redacts_secrets(self):
+        record = logging.LogRecord(
+            'homework', logging.ERROR, __file__, 1,
+            logs.lazy(
+                'headers {headers}',
+                headers={'Authorization': 'OAuth y0_secret-token'}
+            ),
+            None, None
+        )
+        record.tenant = 'abc'
+        record.status_code = 500
+        data = json.loads(logs.JsonFormatter().format(record))
+        assert 'secret' not in data['msg']
+        assert data['tenant'] == 'abc'
+        assert data['status_code'] == 500
+        assert data['level'] == 'ERROR'
+
+    def test_deduplicate(self):
+        now = [0.0]
+        dedup = logs.Deduplicate(window=60, clock=lambda: now[0])
+
+        def record(value):
+            item = logging.LogRecord(
+                'homework', logging.ERROR, __file__, 1,
+                logs.lazy('Сбой {value}', value=value), None, None
+            )
+            item.exception = 'ConnectionError'
+            return item
+
+        assert dedup.filter(record(1))
+        assert not dedup.filter(record(2))
+        assert not dedup.filter(record(3))
+        now[0] = 61
+        last = record(4)
+        assert dedup.filter(last)
+        assert last.repeated == 2
+
+    def test_sampling(self):
+        dedup = logs.Deduplicate(window=0, sample_rate=0.5,
+                                 rand=iter([0.1, 0.9]).__next__)
+        info = logging.LogRecord(
+            'homework', logging.INFO, __file__, 1, 'x', None, None
+        )
+        assert dedup.filter(info)
+        assert not dedup.filter(info)
+
+    def test_api_answer_is_logged_with_latency(self, caplog):
+        class Response:
+            status_code = 200
+
+        class Timer:
+            elapsed = 0.123456
+
+        with caplog.at_level(logging.INFO, logger='homework'):
+            homework.log_answer(Response(), Timer())
+        [record] = caplog.records
+        assert record.levelno == logging.INFO
+        assert record.latency == 0.1235
+        assert record.status_code == 200
+        info = logging.LogRecord(
+            'homework', logging.INFO, __file__, 1, 'x', None, None
+        )
+        dedup = logs.Deduplicate(window=60, rand=lambda: 0)
+        assert dedup.filter(info) and dedup.filter(info), (
+            'Частые записи ниже WARNING не должны схлопываться'
+        )
@@ -0,0 +1,38 @@
+import urllib.request
+
+import metrics
+
+
+class TestMetrics:
+
+    def test_render(self):
+        registry = metrics.Registry()
+        errors = registry.register(
+            metrics.Counter('errors_total', 'Ошибки', ('exception',))
+        )
+        latency = registry.register(
+            metrics.Histogram('latency_seconds', 'Задержка', (0.1, 1))
+        )
+        errors.inc('ServerDenied')
+        errors.inc('ServerDenied')
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+        text = registry.render()
+        assert 'errors_total{exception="ServerDenied"} 2' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert 'latency_seconds_count 3' in text
+
+    def test_serve(self):
+        server = metrics.serve(port=0)
+        try:
+            port = server.server_port
+            with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/metrics'
+            ) as response:
+                body = response.read().decode()
+            assert '# TYPE homework_api_request_seconds histogram' in body
+        finally:
+            server.shutdown()
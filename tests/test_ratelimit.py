@@ -0,0 +1,58 @@
+import threading
+import time
+
+from ratelimit import RateLimiter, TokenBucket, parse_retry_after
+
+
+class TestRateLimit:
+
+    def test_bucket(self):
+        bucket = TokenBucket(rate=2, capacity=2, now=0)
+        assert bucket.take(0) == 0
+        assert bucket.take(0) == 0
+        assert bucket.take(0) == 0.5
+        assert bucket.take(0.5) == 0
+        bucket.block(10)
+        assert bucket.take(5) == 5
+
+    def test_budget_and_retry_after(self):
+        now = [0.0]
+        limiter = RateLimiter(rate=1, burst=3, clock=lambda: now[0])
+        limiter.acquire()
+        assert limiter.budget() == 2
+        limiter.retry_after(30)
+        assert limiter.budget() == 0
+        now[0] = 31
+        assert limiter.budget() == 3
+
+    def test_priority_order(self):
+        now = [0.0]
+        limiter = RateLimiter(rate=4, burst=3, key_rate=100, key_burst=100,
+                              clock=lambda: now[0])
+        for _ in range(3):
+            limiter.acquire()
+        order = []
+        threads = []
+        for priority in (2, 1, 0):
+            thread = threading.Thread(
+                target=lambda p=priority: (
+                    limiter.acquire(priority=p), order.append(p)
+                )
+            )
+            thread.start()
+            threads.append(thread)
+        while len(limiter._waiters) < 3:
+            time.sleep(0.001)
+        for step in range(1, 4):
+            now[0] = step / 4
+            while len(order) < step:
+                time.sleep(0.001)
+        for thread in threads:
+            thread.join(2)
+        assert order == [0, 1, 2]
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('120') == 120
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT',
+                                 now=1445412470) == 10
@@ -0,0 +1,12 @@
+from render import Renderer
+
+
+class TestRender:
+
+    def test_cached_rendering(self):
+        renderer = Renderer('{name}: {verdict}', {'approved': 'ok'})
+        first = renderer.render('hw1', 'approved')
+        second = renderer.render('hw1', 'approved')
+        assert first == 'hw1: ok'
+        assert first is second, 'Повторный рендер должен браться из кеша'
+        assert renderer.cache_info().hits == 1
@@ -0,0 +1,48 @@
+import pytest
+
+from catalogs import get_catalog
+from render_pool import RenderPool, batches, prepare
+
+HOMEWORKS = [
+    {'homework_name': 'hw{}'.format(index), 'status': 'approved'}
+    for index in range(25)
+]
+
+
+class TestRenderPool:
+
+    def test_prepare(self):
+        known = {'hw0': 'approved', 'hw1': 'reviewing'}
+        prepared = prepare(known, HOMEWORKS[:3])
+        assert prepared == [
+            ('hw1', 'approved', 'reviewing',
+             get_catalog().render('hw1', 'approved')),
+            ('hw2', 'approved', None,
+             get_catalog().render('hw2', 'approved')),
+        ]
+
+    def test_batches(self):
+        assert list(batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    @pytest.mark.parametrize('kind', ['thread', 'process'])
+    def test_pool_matches_inline(self, kind):
+        pool = RenderPool(kind, workers=2, batch=4)
+        try:
+            assert pool.prepare({}, iter(HOMEWORKS), 'en') == prepare(
+                {}, HOMEWORKS, 'en'
+            )
+            with pytest.raises(KeyError):
+                pool.prepare({}, [{'status': 'approved'}])
+        finally:
+            pool.close()
+
+    def test_process_pool_does_not_fork(self):
+        pool = RenderPool('process', workers=1)
+        try:
+            assert pool.executor._mp_context.get_start_method() != 'fork'
+        finally:
+            pool.close()
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            RenderPool('gpu')
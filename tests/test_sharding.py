@@ -0,0 +1,144 @@
+import pytest
+
+import homework
+from sharding import HashRing, LeaseTable, Shard, open_shard
+from storage import FileStore, SQLiteStore
+from tenants import Tenant, TenantRegistry
+from webhook import NotOwner
+
+
+@pytest.fixture
+def tenants():
+    return [Tenant('token{}'.format(index), index) for index in range(200)]
+
+
+def make_shard(path, worker, tenants, now, store=None):
+    leases = LeaseTable(path, worker=worker, ttl=30, clock=lambda: now[0])
+    return Shard(leases, tenants, store, vnodes=32)
+
+
+class TestSharding:
+
+    def test_ring_moves_only_new_worker_share(self, tenants):
+        before = HashRing(['a', 'b'])
+        after = HashRing(['a', 'b', 'c'])
+        moved = [
+            tenant for tenant in tenants
+            if before.owner(tenant.key) != after.owner(tenant.key)
+        ]
+        assert moved
+        assert all(after.owner(tenant.key) == 'c' for tenant in moved)
+        assert HashRing([]).owner('key') is None
+
+    def test_join_and_leave(self, tmp_path, tenants):
+        path = str(tmp_path / 'leases.sqlite')
+        now = [0.0]
+        first = make_shard(path, 'a', tenants, now)
+        first.rebalance()
+        assert len(first.owned) == len(tenants)
+        second = make_shard(path, 'b', tenants, now)
+        second.rebalance()
+        assert not second.owned
+        first.rebalance()
+        second.rebalance()
+        assert first.owned and second.owned
+        assert not first.owned & second.owned
+        assert len(first.owned | second.owned) == len(tenants)
+        with first.lease(tenants[0]) as owned_first:
+            with second.lease(tenants[0]) as owned_second:
+                assert owned_first != owned_second
+        second.close()
+        first.rebalance()
+        assert len(first.owned) == len(tenants)
+
+    def test_dead_worker_lease_expires(self, tmp_path, tenants):
+        path = str(tmp_path / 'leases.sqlite')
+        now = [0.0]
+        first = make_shard(path, 'a', tenants, now)
+        first.rebalance()
+        second = make_shard(path, 'b', tenants, now)
+        second.rebalance()
+        first.rebalance()
+        second.rebalance()
+        now[0] = 31
+        with second.lease(tenants[0]) as owned:
+            assert not owned
+        first.rebalance()
+        assert len(first.owned) == len(tenants)
+
+    def test_subscriber_follows_owned_tenants(self, tmp_path, tenants):
+        path = str(tmp_path / 'leases.sqlite')
+        now = [0.0]
+        first = make_shard(path, 'a', tenants, now)
+        first.rebalance()
+        changes = []
+        first.subscribe(lambda gained, dropped: changes.append(
+            (len(gained), len(dropped))
+        ))
+        assert changes == [(len(tenants), 0)]
+        second = make_shard(path, 'b', tenants, now)
+        second.rebalance()
+        first.rebalance()
+        dropped = len(tenants) - len(first.owned)
+        assert changes[-1] == (0, dropped)
+        second.close()
+        first.rebalance()
+        assert changes[-1] == (dropped, 0), 'Отданные аккаунты возвращаются'
+
+    def test_gained_tenants_restored(self, tmp_path):
+        path = str(tmp_path / 'leases.sqlite')
+        store = SQLiteStore(str(tmp_path / 'state.sqlite'))
+        tenant = Tenant('token', 1, current_date=100)
+        store.save(tenant)
+        store.flush()
+        tenant.current_date = 0
+        shard = make_shard(path, 'a', [tenant], [0.0], store)
+        gained, _ = shard.rebalance()
+        assert gained == {tenant.key}
+        assert tenant.current_date == 100
+        store.close()
+
+    def test_queued_deliveries_keep_lease(self, tmp_path):
+        path = str(tmp_path / 'leases.sqlite')
+        store = SQLiteStore(str(tmp_path / 'state.sqlite'))
+        tenants = [Tenant(f'token{index}', index) for index in range(20)]
+        now = [0.0]
+        first = make_shard(path, 'a', tenants, now, store)
+        first.rebalance()
+        second = make_shard(path, 'b', tenants, now, store)
+        second.rebalance()
+        moving = [
+            tenant for tenant in tenants
+            if HashRing(['a', 'b'], 32).owner(tenant.key) == 'b'
+        ]
+        assert moving
+        for tenant in moving:
+            tenant.pending = 1
+        first.rebalance()
+        assert all(first.holds(tenant) for tenant in moving)
+        assert not first.owned & {tenant.key for tenant in moving}
+        assert not second.rebalance()[0], 'Аренда держится до доставки'
+        with pytest.raises(NotOwner):
+            homework.receive_event(
+                None, TenantRegistry(moving), store, moving[0].token,
+                {'homeworks': []}, shard=first
+            )
+        for tenant in moving:
+            tenant.pending = 0
+        first.rebalance()
+        assert not any(first.holds(tenant) for tenant in moving)
+        moving[0].current_date = 42
+        homework.save_tenant(moving[0], store, first)
+        store.flush()
+        assert moving[0].key not in store.load(), (
+            'Бывший владелец не пишет состояние чужого аккаунта'
+        )
+        gained, _ = second.rebalance()
+        assert gained == {tenant.key for tenant in moving}
+        store.close()
+
+    def test_open_shard(self, tmp_path, tenants):
+        assert open_shard(tenants, None, path=None) is None
+        store = FileStore(str(tmp_path / 'state.jsonl'))
+        with pytest.raises(ValueError):
+            open_shard(tenants, store, path=str(tmp_path / 'leases.sqlite'))
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from exceptions import ServerDenied
+import metrics
+from singleflight import SingleFlight
+
+WAITERS = 5
+
+
+def capture(func, *args):
+    try:
+        return func(*args)
+    except Exception as error:
+        return error
+
+
+def run_together(func):
+    """Запускает WAITERS вызовов так, что все ждут первого."""
+    flight = SingleFlight()
+    release = threading.Event()
+    results = []
+
+    def call():
+        results.append(capture(flight.do, 'key', func, release))
+
+    threads = [threading.Thread(target=call) for _ in range(WAITERS)]
+    threads[0].start()
+    while not len(flight):
+        time.sleep(0.001)
+    coalesced = metrics.COALESCED.value()
+    for thread in threads[1:]:
+        thread.start()
+    while metrics.COALESCED.value() < coalesced + WAITERS - 1:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert not len(flight)
+    return flight, results
+
+
+class TestSingleFlight:
+
+    def test_callers_share_one_call(self):
+        calls = []
+
+        def fetch(release):
+            calls.append(1)
+            release.wait(5)
+            return {'homeworks': []}
+
+        _, results = run_together(fetch)
+        assert len(calls) == 1
+        assert len(results) == WAITERS
+        assert all(result is results[0] for result in results)
+
+    def test_error_reaches_every_waiter(self):
+        def fetch(release):
+            release.wait(5)
+            raise ServerDenied('denied')
+
+        flight, results = run_together(fetch)
+        assert all(isinstance(result, ServerDenied) for result in results)
+        released = threading.Event()
+        released.set()
+        with pytest.raises(ServerDenied):
+            flight.do('key', fetch, released)
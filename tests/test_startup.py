@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED = ('telegram', 'requests', 'asyncio', 'sharding')
+
+
+def import_times(module):
+    """Возвращает время импорта модулей по данным python -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 10 ** 6
+    return times
+
+
+class TestStartup:
+
+    def test_heavy_imports_deferred(self):
+        times = import_times('homework')
+        loaded = [name for name in DEFERRED if name in times]
+        assert not loaded, (
+            f'Модули {loaded} должны импортироваться при первом использовании'
+        )
+
+    def test_no_log_handler_on_import(self):
+        result = subprocess.run(
+            [
+                sys.executable, '-c',
+                'import logging, homework; '
+                'print(len(logging.getLogger("homework").handlers))'
+            ],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        assert result.stdout.strip() == '0'
@@ -0,0 +1,64 @@
+import pytest
+
+from storage import FileStore, SQLiteStore, open_store
+from tenants import Tenant
+
+
+@pytest.fixture(params=['state.sqlite', 'state.jsonl'])
+def store_path(request, tmp_path):
+    return str(tmp_path / request.param)
+
+
+class TestStorage:
+
+    def test_open_store(self, store_path):
+        store = open_store(store_path)
+        expected = SQLiteStore if store_path.endswith('.sqlite') else FileStore
+        assert isinstance(store, expected)
+        store.close()
+        assert open_store(None) is None
+
+    def test_roundtrip(self, store_path):
+        store = open_store(store_path)
+        tenant = Tenant('token', 1, current_date=100)
+        tenant.homeworks['hw1'] = 'reviewing'
+        store.save(tenant)
+        tenant.current_date = 200
+        tenant.homeworks['hw1'] = 'approved'
+        store.save(tenant)
+        store.close()
+
+        restored = Tenant('token', 1, current_date=0)
+        store = open_store(store_path)
+        store.restore([restored])
+        store.close()
+        assert restored.current_date == 200
+        assert restored.homeworks == {'hw1': 'approved'}
+
+    def test_writes_are_batched(self, store_path):
+        store = open_store(store_path)
+        store.flush_interval = 3600
+        store.batch = 3
+        for token in ('a', 'b'):
+            store.save(Tenant(token, 1, current_date=1))
+        assert store.load() == {}, 'Запись должна откладываться до сброса'
+        store.save(Tenant('c', 1, current_date=1))
+        assert len(store.load()) == 3
+        store.close()
+
+    def test_file_store_compacts_while_running(self, tmp_path):
+        path = tmp_path / 'state.jsonl'
+        store = FileStore(str(path), batch=1)
+        store.load()
+        tenants = [Tenant(f'token{index}', index) for index in range(3)]
+        for date in range(1, 50):
+            for tenant in tenants:
+                tenant.current_date = date
+                tenant.homeworks['hw1'] = 'reviewing'
+                store.save(tenant)
+            assert len(path.read_text().splitlines()) <= 2 * len(tenants)
+        store.close()
+        store = FileStore(str(path))
+        checkpoints = store.load()
+        assert {item.current_date for item in checkpoints.values()} == {49}
+        store.close()
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from streaming import ObjectStream
+
+
+def chunked(data, size=5):
+    body = data if isinstance(data, bytes) else json.dumps(
+        data, ensure_ascii=False
+    ).encode()
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class TestStreaming:
+
+    def test_yields_items_and_fields(self):
+        document = {
+            'homeworks': [
+                {'homework_name': 'Проект 1', 'status': 'approved'},
+                {'homework_name': 'hw2', 'status': 'reviewing', 'id': 12345},
+            ],
+            'current_date': 1234567890,
+        }
+        closed = []
+        stream = ObjectStream(
+            chunked(document), 'homeworks', close=lambda: closed.append(1)
+        )
+        assert list(stream) == document['homeworks']
+        assert stream.fields == {'current_date': 1234567890}
+        assert closed == [1]
+
+    def test_error_field_reported_before_items(self):
+        seen = []
+        stream = ObjectStream(
+            chunked({'code': 'not_authenticated', 'homeworks': [1]}),
+            'homeworks',
+            on_field=lambda key, value: seen.append((key, value))
+        )
+        assert next(iter(stream)) == 1
+        assert seen == [('code', 'not_authenticated')]
+
+    @pytest.mark.parametrize('document, error', [
+        ([1, 2], TypeError),
+        ({'homeworks': {'a': 1}}, TypeError),
+        ({'current_date': 1}, KeyError),
+        (b'{"homeworks": [1, 2', ValueError),
+    ])
+    def test_shape_errors(self, document, error):
+        with pytest.raises(error):
+            list(ObjectStream(chunked(document), 'homeworks'))
+
+    def test_numbers_split_across_chunks(self):
+        stream = ObjectStream(
+            [b'{"homeworks": [12', b'34, 5', b'6], "current_date": 1', b'0}'],
+            'homeworks'
+        )
+        assert list(stream) == [1234, 56]
+        assert stream.fields['current_date'] == 10
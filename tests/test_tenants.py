@@ -0,0 +1,102 @@
+import json
+
+from scheduler import Backoff, Scheduler
+from tenants import Tenant, TenantRegistry
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.now += delay
+
+
+class TestTenants:
+
+    def test_tenant_headers(self):
+        tenant = Tenant('token', 1)
+        assert tenant.headers == {'Authorization': 'OAuth token'}
+        assert not hasattr(tenant, '__dict__'), (
+            'Tenant должен использовать __slots__'
+        )
+
+    def test_registry_load(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1},
+            {'token': 'b', 'chat_id': 2},
+        ]))
+        registry = TenantRegistry.load(str(path), current_date=5)
+        assert len(registry) == 2
+        assert registry.get('b').chat_id == 2
+        assert all(tenant.current_date == 5 for tenant in registry)
+
+    def test_registry_duplicate(self):
+        registry = TenantRegistry([Tenant('a', 1)])
+        try:
+            registry.add(Tenant('a', 2))
+        except ValueError:
+            pass
+        else:
+            assert False, 'Повторный токен должен вызывать ValueError'
+
+
+class TestScheduler:
+
+    def test_spread_and_order(self):
+        clock = FakeClock()
+        scheduler = Scheduler(60, clock=clock, sleep=clock.sleep)
+        scheduler.spread(['a', 'b', 'c'])
+        calls = []
+        for _ in range(4):
+            scheduler.run_once(lambda item: calls.append((item, clock.now)))
+        assert calls == [('a', 0), ('b', 20), ('c', 40), ('a', 60)]
+
+    def test_remove_and_add(self):
+        clock = FakeClock()
+        scheduler = Scheduler(60, clock=clock, sleep=clock.sleep)
+        scheduler.spread(['a', 'b'])
+
+        def poll(item):
+            scheduler.remove([item])
+
+        scheduler.run_once(poll)
+        assert len(scheduler) == 1, 'Убранный при опросе элемент не вернется'
+        scheduler.remove(['b'])
+        assert not scheduler and scheduler.next_delay() is None
+        scheduler.add(['a', 'c'])
+        scheduler.add(['c'])
+        assert len(scheduler) == 2
+        assert [scheduler.pop(), scheduler.pop(), scheduler.pop()] == [
+            'a', 'c', None
+        ]
+
+
+class TestBackoff:
+
+    def test_next_interval(self):
+        backoff = Backoff(600, fast=45, maximum=2400, factor=2)
+        assert backoff.next(0, False, False) == 600
+        assert backoff.next(600, False, True) == 45
+        assert backoff.next(45, True, False) == 600
+        assert backoff.next(600, False, False) == 1200
+        assert backoff.next(1200, False, False) == 2400
+        assert backoff.next(2400, False, False) == 2400
+
+    def test_spread(self):
+        backoff = Backoff(600, jitter=0.1, rand=lambda: 1.0)
+        assert round(backoff.spread(100), 6) == 110
+        backoff.rand = lambda: 0.0
+        assert round(backoff.spread(100), 6) == 90
+
+    def test_callback_delay(self):
+        clock = FakeClock()
+        scheduler = Scheduler(60, clock=clock, sleep=clock.sleep)
+        scheduler.schedule('a')
+        scheduler.run_once(lambda item: 5)
+        assert scheduler.next_delay() == 5
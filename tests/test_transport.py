@@ -0,0 +1,11 @@
+from transport import make_session
+
+
+class TestTransport:
+
+    def test_session_pool(self):
+        session = make_session(pool_size=7, retries=2, backoff_factor=0.1)
+        adapter = session.get_adapter('https://practicum.yandex.ru/')
+        assert adapter._pool_maxsize == 7
+        assert adapter.max_retries.total == 2
+        assert adapter.max_retries.backoff_factor == 0.1
@@ -0,0 +1,109 @@
+import functools
+import http.client
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from delivery import DeliveryQueue
+import homework
+from ratelimit import RateLimiter
+from tenants import Tenant, TenantRegistry
+import webhook
+
+
+class RecordingBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def receiver():
+    bot = RecordingBot()
+    queue = DeliveryQueue(bot, limiter=RateLimiter(100, 100, 100, 100))
+    tenants = TenantRegistry([Tenant('token', 5, current_date=100)])
+    server = webhook.serve(
+        functools.partial(homework.receive_event, queue, tenants, None),
+        port=0,
+        secret='s3cret'
+    )
+    yield queue, tenants, f'http://127.0.0.1:{server.server_port}/events'
+    server.shutdown()
+    queue.close(2)
+
+
+def post(url, body, token='token', secret='s3cret'):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode(),
+        headers={
+            'Authorization': f'OAuth {token}',
+            'X-Webhook-Secret': secret,
+        },
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+class TestWebhook:
+
+    def test_event_is_delivered(self, receiver):
+        queue, tenants, url = receiver
+        event = {'homeworks': [{'homework_name': 'hw', 'status': 'approved'}]}
+        assert post(url, event) == 202
+        assert post(url, event) == 202
+        queue.start().close(2)
+        assert len(queue.bot.sent) == 1, (
+            'Повторное событие не должно дублироваться'
+        )
+        tenant = tenants.get('token')
+        assert queue.bot.sent[0] == (5, tenant.catalog.render('hw', 'approved'))
+        assert tenant.homeworks == {'hw': 'approved'}
+        assert tenant.queued == {}
+        assert tenant.current_date == 100
+
+    def test_rejected_events(self, receiver):
+        queue, _, url = receiver
+        event = {'homeworks': []}
+        assert post(url, event, secret='wrong') == 401
+        assert post(url, event, token='other') == 404
+        assert post(url, {'homeworks': {}}) == 400
+        assert queue.backlog() == 0
+
+    def test_invalid_content_length(self, receiver):
+        _, _, url = receiver
+        host, port = url.split('/')[2].split(':')
+        for length in ('-1', 'abc'):
+            connection = http.client.HTTPConnection(host, int(port))
+            connection.putrequest('POST', '/events')
+            connection.putheader('Authorization', 'OAuth token')
+            connection.putheader('X-Webhook-Secret', 's3cret')
+            connection.putheader('Content-Length', length)
+            connection.endheaders()
+            assert connection.getresponse().status == 400
+            connection.close()
+
+    def test_non_ascii_secret_rejected(self, receiver):
+        _, _, url = receiver
+        host, port = url.split('/')[2].split(':')
+        connection = http.client.HTTPConnection(host, int(port))
+        connection.putrequest('POST', '/events')
+        connection.putheader('Authorization', 'OAuth token')
+        connection.putheader('X-Webhook-Secret', 'сек'.encode())
+        connection.putheader('Content-Length', '0')
+        connection.endheaders()
+        assert connection.getresponse().status == 401
+        connection.close()
+
+    def test_serve_requires_secret(self):
+        with pytest.raises(ValueError):
+            webhook.serve(print, port=0, secret=None)
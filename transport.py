@@ -0,0 +1,33 @@
+import os
+
+POOL_SIZE = int(os.getenv('POOL_SIZE', 10))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', 0.5))
+RETRY_STATUSES = (502, 503, 504)
+
+
+def make_session(
+    pool_size=POOL_SIZE,
+    retries=HTTP_RETRIES,
+    backoff_factor=HTTP_BACKOFF
+):
+    """Создает долгоживущую сессию с пулом keep-alive соединений."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
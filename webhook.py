@@ -0,0 +1,117 @@
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hmac
+import json
+import logging
+import os
+import threading
+
+from logs import lazy
+
+WEBHOOK_PORT = os.getenv('WEBHOOK_PORT')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_PATH = '/events'
+MAX_BODY = 1048576
+AUTH_PREFIX = 'OAuth '
+
+EVENT_REJECTED = 'Событие отклонено: {error}'
+NO_SECRET = 'Для приема событий на порту {port} нужен WEBHOOK_SECRET'
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownTenant(LookupError):
+    """Событие пришло для токена, которого нет в реестре."""
+
+    pass
+
+
+class NotOwner(LookupError):
+    """Событие пришло для аккаунта, который опрашивает другой воркер."""
+
+    pass
+
+
+class EventHandler(BaseHTTPRequestHandler):
+    """Принимает POST /events с телом в формате ответа API Практикума.
+
+    Аккаунт определяется по заголовку Authorization: OAuth <токен>,
+    ретранслятор подтверждает себя заголовком X-Webhook-Secret.
+    """
+
+    on_event = None
+    secret = None
+
+    def reply(self, status):
+        """Отвечает пустым телом со статусом status."""
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def authorized(self):
+        """Проверяет секрет ретранслятора.
+
+        Сравниваются байты: http.server читает заголовки как latin-1,
+        а compare_digest не принимает строки с символами вне ASCII.
+        """
+        return hmac.compare_digest(
+            self.headers.get('X-Webhook-Secret', '').encode('latin-1'),
+            self.secret.encode('utf-8')
+        )
+
+    def do_POST(self):
+        """Передает событие в on_event."""
+        if self.path != WEBHOOK_PATH:
+            return self.reply(HTTPStatus.NOT_FOUND)
+        authorization = self.headers.get('Authorization', '')
+        if not self.authorized() or not authorization.startswith(AUTH_PREFIX):
+            return self.reply(HTTPStatus.UNAUTHORIZED)
+        length = self.headers.get('Content-Length') or '0'
+        if not length.isdigit():
+            return self.reply(HTTPStatus.BAD_REQUEST)
+        length = int(length)
+        if length > MAX_BODY:
+            return self.reply(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        try:
+            self.on_event(
+                authorization[len(AUTH_PREFIX):],
+                json.loads(self.rfile.read(length))
+            )
+        except UnknownTenant:
+            return self.reply(HTTPStatus.NOT_FOUND)
+        except NotOwner:
+            return self.reply(HTTPStatus.MISDIRECTED_REQUEST)
+        except (ValueError, TypeError, KeyError) as error:
+            logger.warning(lazy(EVENT_REJECTED, error=error))
+            return self.reply(HTTPStatus.BAD_REQUEST)
+        return self.reply(HTTPStatus.ACCEPTED)
+
+    def log_message(self, *args):
+        """Не пишет каждый запрос в stderr."""
+        pass
+
+
+def serve(on_event, port=WEBHOOK_PORT, host=WEBHOOK_HOST,
+          secret=WEBHOOK_SECRET):
+    """Запускает прием событий в фоновом потоке.
+
+    Без секрета ретранслятора прием не запускается: иначе любой, кто
+    знает токен студента, мог бы подделать смену статуса.
+    """
+    if port in (None, ''):
+        return None
+    if not secret:
+        raise ValueError(NO_SECRET.format(port=port))
+    handler = type('Handler', (EventHandler,), dict(
+        on_event=staticmethod(on_event),
+        secret=secret
+    ))
+    server = ThreadingHTTPServer((host, int(port)), handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever,
+        name='webhook',
+        daemon=True
+    ).start()
+    return server